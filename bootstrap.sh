@@ -7,13 +7,5 @@ pip install --upgrade pip
 pip install -r requirements.txt
 python src/generate_data.py
 
-mkdir -p notebooks_build reports/latest assets
-for nb in notebooks_py/*.py; do
-  base=$(basename "$nb" .py)
-  jupytext --from py:percent --to ipynb "$nb" -o "notebooks_build/${base}.ipynb"
-done
-
-for nb in notebooks_build/*.ipynb; do
-for nb in notebooks/*.ipynb; do
-  jupyter nbconvert --to html --execute "$nb" --output-dir reports/latest
-done
+# converts notebooks_py/*.py, executes the labs in parallel and writes HTML + assets/*.png
+python src/run_reports.py --output-dir reports/latest
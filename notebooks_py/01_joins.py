@@ -10,6 +10,9 @@
 # %% [markdown]
 # ## Data model recap
 # Tables used in this lab:
+# - **cohort_cube**: customers and revenue per cohort, period offset and segment (see `src/cohorts.py`).
+# - **daily_revenue**, **revenue_by_product_day**, **customer_revenue**: rollups of `orders` ⨝ `order_items`
+#   built with the warehouse (see `src/rollups.py`) so the KPIs below never rescan the fact join.
 # - **customers**: one row per customer with signup metadata (country, channel).
 # - **orders**: header-level information for each purchase including timestamps.
 # - **order_items**: line items connected to orders and products.
@@ -23,40 +26,29 @@
 
 # %%
 import os
+import sys
 from pathlib import Path
 
-import duckdb
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 from IPython.display import display
 
-sns.set_theme(style="whitegrid")
-
-
-def get_project_root() -> Path:
-    if "__file__" in globals():
-        start = Path(__file__).resolve()
-    else:
-        start = Path.cwd().resolve()
-    for path in [start, *start.parents]:
-        if (path / "sql" / "schema.sql").exists():
-            return path
-    return start
+# Make src/ importable from the repo root, notebooks_build/ or a script run
+_here = Path(__file__).resolve().parent if "__file__" in globals() else Path.cwd()
+sys.path.insert(0, str(next(p / "src" for p in [_here, *_here.parents] if (p / "src" / "warehouse.py").exists())))
+import arrow_ops
+import cohorts
+import profiling
+import warehouse
 
+sns.set_theme(style="whitegrid")
 
-PROJECT_ROOT = get_project_root()
-SCHEMA_PATH = PROJECT_ROOT / "sql" / "schema.sql"
-SEED_PATH   = PROJECT_ROOT / "sql" / "seed.sql"
-
-# Change to project root so relative paths in seed.sql work
-os.chdir(PROJECT_ROOT)
-
-con = duckdb.connect(database=":memory:")
-con.execute(SCHEMA_PATH.read_text())
-con.execute(SEED_PATH.read_text())
+# Change to project root so relative asset paths work
+os.chdir(warehouse.PROJECT_ROOT)
 
-print("Tables loaded:", con.execute("SHOW TABLES").fetchall())
+LAB_TABLES = ["customers", "products", "daily_revenue", "revenue_by_product_day", "customer_revenue", "cohort_cube"]
+print("Tables used:", LAB_TABLES)
 
 # %% [markdown]
 # ## Basic joins & daily revenue
@@ -65,25 +57,19 @@ print("Tables loaded:", con.execute("SHOW TABLES").fetchall())
 # Steps:
 # 1. Join `orders` and `order_items` on `order_id`.
 # 2. Aggregate revenue by order date (derived from `order_ts`) to view daily trends.
+#
+# Both steps are materialized in the `daily_revenue` rollup, which is what we query.
 
 # %%
-daily_revenue = con.execute(
+daily_revenue = warehouse.query(
     """
-    WITH itemized AS (
-        SELECT
-            CAST(o.order_ts AS DATE) AS order_date,
-            oi.qty * oi.unit_price_usd AS line_revenue
-        FROM orders o
-        JOIN order_items oi USING (order_id)
-    )
     SELECT
         order_date,
-        SUM(line_revenue) AS daily_revenue_usd
-    FROM itemized
-    GROUP BY order_date
+        revenue_usd AS daily_revenue_usd
+    FROM daily_revenue
     ORDER BY order_date
     """
-).fetchdf()
+)
 
 display(daily_revenue.head())
 
@@ -108,18 +94,18 @@ plt.show()
 # The query aggregates revenue at both levels to reveal the long-tail pattern.
 
 # %%
-category_perf = con.execute(
+category_perf = warehouse.query(
     """
     SELECT
         p.category,
-        SUM(oi.qty * oi.unit_price_usd) AS revenue_usd,
-        COUNT(DISTINCT oi.product_id) AS products_sold
-    FROM order_items oi
+        SUM(r.revenue_usd) AS revenue_usd,
+        COUNT(DISTINCT r.product_id) AS products_sold
+    FROM revenue_by_product_day r
     JOIN products p USING (product_id)
     GROUP BY 1
     ORDER BY revenue_usd DESC
     """
-).fetchdf()
+)
 
 display(category_perf)
 
@@ -132,20 +118,20 @@ plt.tight_layout()
 plt.savefig('assets/joins_revenue_by_category.png', bbox_inches='tight')
 plt.show()
 
-product_perf = con.execute(
+product_perf = warehouse.query(
     """
     SELECT
         p.product_name,
         p.category,
-        SUM(oi.qty * oi.unit_price_usd) AS revenue_usd,
-        COUNT(*) AS item_lines
-    FROM order_items oi
+        SUM(r.revenue_usd) AS revenue_usd,
+        SUM(r.item_lines) AS item_lines
+    FROM revenue_by_product_day r
     JOIN products p USING (product_id)
     GROUP BY 1, 2
     ORDER BY revenue_usd DESC
     LIMIT 10
     """
-).fetchdf()
+)
 
 display(product_perf)
 
@@ -158,32 +144,34 @@ display(product_perf)
 # ## Customer lifetime value snapshot
 # *Definition*: **Lifetime value (LTV)** = total revenue attributed to a customer across all orders.
 # We compute order count and revenue per customer to spot high-value segments.
+# The result has one row per customer, so it stays an Arrow table: the summary and histogram
+# below are computed on its buffers without building a DataFrame.
 
 # %%
-customer_ltv = con.execute(
+customer_ltv = warehouse.query_arrow(
     """
     SELECT
         c.customer_id,
         c.country,
         c.channel,
-        COUNT(DISTINCT o.order_id) AS orders,
-        SUM(oi.qty * oi.unit_price_usd) AS revenue_usd
+        SUM(cr.orders) AS orders,
+        SUM(cr.revenue_usd) AS revenue_usd
     FROM customers c
-    JOIN orders o USING (customer_id)
-    JOIN order_items oi USING (order_id)
+    JOIN customer_revenue cr USING (customer_id)
     GROUP BY 1, 2, 3
     ORDER BY revenue_usd DESC
     """
-).fetchdf()
+)
 
-display(customer_ltv.head())
+display(customer_ltv.slice(0, 5).to_pandas())
 
-summary = customer_ltv["revenue_usd"].describe(percentiles=[0.5, 0.75, 0.9, 0.95])
+summary = arrow_ops.describe(customer_ltv["revenue_usd"], percentiles=[0.5, 0.75, 0.9, 0.95])
 print("\nRevenue distribution summary (USD):")
 print(summary)
 
+ltv_counts, ltv_edges = arrow_ops.histogram(customer_ltv["revenue_usd"], bins=30)
 plt.figure(figsize=(8, 4))
-sns.histplot(customer_ltv["revenue_usd"], bins=30, color="#f97316")
+plt.stairs(ltv_counts, ltv_edges, fill=True, color="#f97316")
 plt.title("Customer LTV distribution")
 plt.xlabel("Lifetime revenue (USD)")
 plt.ylabel("Customers")
@@ -196,46 +184,21 @@ plt.show()
 # - Acquisition channel and country columns help segment high-value cohorts for targeted campaigns.
 
 # %% [markdown]
-# ## Signup-month cohorts (revenue by order month)
-# A light cohort view comparing signup month to the order month shows how spend evolves.
+# ## Signup-month cohorts (revenue by months since signup)
+# A light cohort view comparing signup month to the months since signup shows how spend evolves.
+# It is a slice of the precomputed `cohort_cube`, which holds every grain and segment.
 
 # %%
-cohort_revenue = con.execute(
-    """
-    WITH customer_signup AS (
-        SELECT
-            customer_id,
-            date_trunc('month', signup_date) AS signup_month
-        FROM customers
-    ), revenue_by_month AS (
-        SELECT
-            cs.signup_month,
-            date_trunc('month', o.order_ts) AS order_month,
-            SUM(oi.qty * oi.unit_price_usd) AS revenue_usd
-        FROM customer_signup cs
-        JOIN orders o USING (customer_id)
-        JOIN order_items oi USING (order_id)
-        GROUP BY 1, 2
-    )
-    SELECT
-        signup_month,
-        order_month,
-        revenue_usd
-    FROM revenue_by_month
-    ORDER BY signup_month, order_month
-    """
-).fetchdf()
+cohort_revenue = warehouse.query_arrow(cohorts.cube_sql(grain="month", basis="signup"))
 
-cohort_pivot = cohort_revenue.pivot(
-    index="signup_month", columns="order_month", values="revenue_usd"
-).fillna(0)
+cohort_pivot = arrow_ops.pivot(cohort_revenue, index="cohort", columns="period_offset", values="revenue_usd").fillna(0)
 
 display(cohort_pivot)
 
 plt.figure(figsize=(10, 5))
 sns.heatmap(cohort_pivot, cmap="Blues", cbar_kws={"label": "Revenue (USD)"})
-plt.title("Revenue by signup cohort and order month")
-plt.xlabel("Order month")
+plt.title("Revenue by signup cohort and months since signup")
+plt.xlabel("Months since signup")
 plt.ylabel("Signup month")
 plt.tight_layout()
 plt.show()
@@ -251,3 +214,7 @@ plt.show()
 # - A few categories dominate revenue, but there is a healthy product long tail to nurture.
 # - High-value customers are concentrated in specific channels/countries, enabling targeted retention.
 # - Cohort heatmaps confirm continued spending beyond the first purchase window.
+
+# %%
+# Query profile for this run: slowest queries first (LAB_PROFILE=plan adds operator trees)
+profiling.show_report("01_joins")
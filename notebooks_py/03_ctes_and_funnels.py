@@ -1,72 +1,45 @@
 # %% [markdown]
 # # 03 - CTEs and funnels
-# Model the visit→signup→purchase journey with CTEs.
+# Model the visit→signup→purchase journey with CTEs and an ordered, single-pass funnel.
 
 # %%
 import os
-import duckdb, pandas as pd, seaborn as sns, matplotlib.pyplot as plt, numpy as np
+import sys
+import pandas as pd, seaborn as sns, matplotlib.pyplot as plt, numpy as np
 from pathlib import Path
 
-sns.set_theme(style='whitegrid')
-
-
-def get_project_root() -> Path:
-    if "__file__" in globals():
-        start = Path(__file__).resolve()
-    else:
-        start = Path.cwd().resolve()
-    for path in [start, *start.parents]:
-        if (path / "sql" / "schema.sql").exists():
-            return path
-    return start
-
-
-PROJECT_ROOT = get_project_root()
-SCHEMA_PATH = PROJECT_ROOT / "sql" / "schema.sql"
-SEED_PATH   = PROJECT_ROOT / "sql" / "seed.sql"
+# Make src/ importable from the repo root, notebooks_build/ or a script run
+_here = Path(__file__).resolve().parent if "__file__" in globals() else Path.cwd()
+sys.path.insert(0, str(next(p / "src" for p in [_here, *_here.parents] if (p / "src" / "warehouse.py").exists())))
+import funnels
+import profiling
+import warehouse
 
-# Change to project root so relative paths in seed.sql work
-os.chdir(PROJECT_ROOT)
+sns.set_theme(style='whitegrid')
+LAB_TABLES = ['events']
 
-con = duckdb.connect(database=':memory:')
-con.execute(SCHEMA_PATH.read_text())
-con.execute(SEED_PATH.read_text())
+# Change to project root so relative asset paths work
+os.chdir(warehouse.PROJECT_ROOT)
 
-tables = ['customers','products','orders','order_items','events','marketing_experiments']
-for table in tables:
-    df = con.execute(f"SELECT * FROM {table} LIMIT 5").fetchdf()
-    display(df)
+warehouse.preview(LAB_TABLES)
 
 # %%
-# Build funnel with CTEs
-funnel = con.execute('''
-    WITH visits AS (
-        SELECT customer_id, MIN(event_ts) AS visit_ts
-        FROM events WHERE event_type='visit'
-        GROUP BY 1
-    ), signups AS (
-        SELECT customer_id, MIN(event_ts) AS signup_ts
-        FROM events WHERE event_type='signup'
-        GROUP BY 1
-    ), purchases AS (
-        SELECT customer_id, MIN(event_ts) AS purchase_ts
-        FROM events WHERE event_type='purchase'
-        GROUP BY 1
-    )
-    SELECT v.customer_id,
-           v.visit_ts,
-           s.signup_ts,
-           p.purchase_ts
-    FROM visits v
-    LEFT JOIN signups s USING (customer_id)
-    LEFT JOIN purchases p USING (customer_id)
-''').fetchdf()
-
-steps = {
-    'visit': funnel['visit_ts'].notna().sum(),
-    'signup': funnel['signup_ts'].notna().sum(),
-    'purchase': funnel['purchase_ts'].notna().sum(),
-}
+# Ordered funnel from a single scan of events: each step must follow the previous one
+FUNNEL_STEPS = ['visit', 'signup', 'purchase']
+step_list = ", ".join(f"'{step}'" for step in FUNNEL_STEPS)
+funnel_events = warehouse.query_arrow(f'''
+    SELECT customer_id, event_ts, event_type
+    FROM events
+    WHERE event_type IN ({step_list})
+    ORDER BY event_ts
+''')
+
+# per-customer timestamp of each reached step, folded in one time-ordered Arrow batch at a time
+# so only a batch is ever converted to pandas; new events update the same state incrementally
+funnel = None
+for batch in funnel_events.to_batches(max_chunksize=warehouse.STREAM_BATCH_ROWS):
+    funnel = funnels.funnel_state(batch.to_pandas(), FUNNEL_STEPS, state=funnel)
+steps = funnels.funnel_totals(funnel, FUNNEL_STEPS)
 conversion_rates = {
     'visit_to_signup': steps['signup'] / steps['visit'],
     'signup_to_purchase': steps['purchase'] / steps['signup'],
@@ -76,10 +49,9 @@ steps, conversion_rates
 
 # %%
 # Funnel bar chart
-funnel_order = ['visit', 'signup', 'purchase']
-counts = [steps[s] for s in funnel_order]
+counts = [steps[s] for s in FUNNEL_STEPS]
 plt.figure(figsize=(7,5))
-sns.barplot(x=funnel_order, y=counts, palette='crest')
+sns.barplot(x=FUNNEL_STEPS, y=counts, palette='crest')
 plt.title('Visit to purchase funnel counts')
 plt.ylabel('Users')
 plt.tight_layout()
@@ -87,24 +59,10 @@ plt.savefig('assets/cte_funnel_counts.png', bbox_inches='tight')
 plt.show()
 
 # %%
-# Step-through rates over time
-monthly = con.execute('''
-    WITH first_events AS (
-        SELECT customer_id,
-               MIN(CASE WHEN event_type='visit' THEN event_ts END) AS first_visit,
-               MIN(CASE WHEN event_type='signup' THEN event_ts END) AS first_signup,
-               MIN(CASE WHEN event_type='purchase' THEN event_ts END) AS first_purchase
-        FROM events
-        GROUP BY 1
-    )
-    SELECT date_trunc('month', first_visit) AS month,
-           COUNT(*) AS visitors,
-           COUNT(first_signup) AS signups,
-           COUNT(first_purchase) AS purchasers
-    FROM first_events
-    GROUP BY 1
-    ORDER BY 1
-''').fetchdf()
+# Step-through rates over time, from the same funnel state grouped by month of first visit
+monthly = funnels.funnel_monthly(funnel, FUNNEL_STEPS).rename(
+    columns={'visit': 'visitors', 'signup': 'signups', 'purchase': 'purchasers'}
+)
 
 monthly['visit_to_signup'] = monthly['signups'] / monthly['visitors']
 # Handle division by zero by replacing 0 with NaN
@@ -124,3 +82,7 @@ plt.show()
 
 # %% [markdown]
 # Business takeaway: Improving signup quality has outsized impact on purchases—focus on landing pages and onboarding where drop-off is highest.
+
+# %%
+# Query profile for this run: slowest queries first (LAB_PROFILE=plan adds operator trees)
+profiling.show_report('03_ctes_and_funnels')
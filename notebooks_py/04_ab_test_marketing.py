@@ -1,52 +1,39 @@
 # %% [markdown]
 # # 04 - A/B test for marketing
-# Evaluate experiment conversion with a z-test.
+# Evaluate experiment conversion with a z-test, then monitor it with an always-valid sequential test.
 
 # %%
 import os
-import duckdb, pandas as pd, seaborn as sns, matplotlib.pyplot as plt, numpy as np
+import sys
+import pandas as pd, seaborn as sns, matplotlib.pyplot as plt, numpy as np
 from pathlib import Path
+from IPython.display import display
 
-sns.set_theme(style='whitegrid')
-
-
-def get_project_root() -> Path:
-    if "__file__" in globals():
-        start = Path(__file__).resolve()
-    else:
-        start = Path.cwd().resolve()
-    for path in [start, *start.parents]:
-        if (path / "sql" / "schema.sql").exists():
-            return path
-    return start
-
+# Make src/ importable from the repo root, notebooks_build/ or a script run
+_here = Path(__file__).resolve().parent if "__file__" in globals() else Path.cwd()
+sys.path.insert(0, str(next(p / "src" for p in [_here, *_here.parents] if (p / "src" / "warehouse.py").exists())))
+import experiments
+import profiling
+import warehouse
 
-PROJECT_ROOT = get_project_root()
-SCHEMA_PATH = PROJECT_ROOT / "sql" / "schema.sql"
-SEED_PATH   = PROJECT_ROOT / "sql" / "seed.sql"
-
-# Change to project root so relative paths in seed.sql work
-os.chdir(PROJECT_ROOT)
+sns.set_theme(style='whitegrid')
+LAB_TABLES = ['marketing_experiments']
 
-con = duckdb.connect(database=':memory:')
-con.execute(SCHEMA_PATH.read_text())
-con.execute(SEED_PATH.read_text())
+# Change to project root so relative asset paths work
+os.chdir(warehouse.PROJECT_ROOT)
 
-tables = ['customers','products','orders','order_items','events','marketing_experiments']
-for table in tables:
-    df = con.execute(f"SELECT * FROM {table} LIMIT 5").fetchdf()
-    display(df)
+warehouse.preview(LAB_TABLES)
 
 # %%
 import statsmodels.stats.api as sms
 
-exp = con.execute('''
+exp = warehouse.query('''
     SELECT "group" AS grp,
            COUNT(*) AS users,
            SUM(CASE WHEN converted THEN 1 ELSE 0 END) AS converters
     FROM marketing_experiments
     GROUP BY 1
-''').fetchdf()
+''')
 
 exp['rate'] = exp['converters'] / exp['users']
 exp
@@ -72,5 +59,46 @@ plt.tight_layout()
 plt.savefig('assets/ab_conversion_rates.png', bbox_inches='tight')
 plt.show()
 
+# %%
+# Sequential test: stream exposures in time order and re-check after every batch.
+# The mSPRT p-value and confidence sequence stay valid under continuous peeking,
+# so the test can be stopped as soon as the p-value drops below alpha.
+trajectory = []
+for exposures, results in experiments.sequential_results(experiments.exposure_batches(batch_rows=50)):
+    trajectory.append(results.assign(exposures=exposures))
+trajectory = pd.concat(trajectory, ignore_index=True)
+treatments = trajectory[trajectory['lift'].notna()]
+display(results)
+
+fig, ax = plt.subplots(figsize=(8,4))
+for (experiment, arm), path in treatments.groupby(['experiment', 'arm']):
+    ax.plot(path['exposures'], path['p_value'], label=f'{experiment}: {arm} vs A')
+ax.axhline(experiments.DEFAULT_ALPHA, color='black', linestyle='--', linewidth=1, label='alpha')
+ax.set_yscale('log')
+ax.set_xlabel('Exposures analysed')
+ax.set_ylabel('Always-valid p-value')
+ax.set_title('Sequential test as exposures arrive')
+ax.legend()
+plt.tight_layout()
+plt.show()
+
+# %%
+# Bootstrap CIs for conversion, revenue per user and days to conversion.
+# CUPED uses each participant's order revenue before exposure to remove pre-existing variance.
+participants = experiments.participant_metrics()
+boot_raw = experiments.bootstrap_metrics(participants, n_resamples=5000, cuped=False)
+boot_cuped = experiments.bootstrap_metrics(participants, n_resamples=5000, cuped=True)
+display(boot_cuped)
+
+lift_width = pd.DataFrame({
+    'raw': boot_raw['lift_ci_high'] - boot_raw['lift_ci_low'],
+    'cuped': boot_cuped['lift_ci_high'] - boot_cuped['lift_ci_low'],
+}).assign(metric=boot_raw['metric'], arm=boot_raw['arm']).dropna()
+lift_width
+
 # %% [markdown]
 # Business takeaway: If group B materially outperforms group A with a low p-value, roll out the winning creative to the broader audience.
+
+# %%
+# Query profile for this run: slowest queries first (LAB_PROFILE=plan adds operator trees)
+profiling.show_report('04_ab_test_marketing')
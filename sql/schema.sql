@@ -1,16 +1,26 @@
+CREATE TYPE country AS ENUM ('CO', 'US', 'MX', 'AR', 'CL', 'PE', 'BR', 'ES');
+CREATE TYPE age_band AS ENUM ('18-24', '25-34', '35-44', '45-54', '55-64', '65+');
+CREATE TYPE income_band AS ENUM ('<1k', '1-2k', '2-4k', '4-6k', '6-10k', '10k+');
+CREATE TYPE channel AS ENUM ('organic', 'paid', 'referral', 'partner');
+CREATE TYPE category AS ENUM ('Analytics', 'Marketing', 'Productivity', 'Finance');
+CREATE TYPE source AS ENUM ('web', 'app', 'partner', 'sales');
+CREATE TYPE event_type AS ENUM ('visit', 'signup', 'trial_start', 'purchase', 'cancel');
+CREATE TYPE experiment AS ENUM ('landing_page_cta');
+CREATE TYPE arm AS ENUM ('A', 'B');
+
 CREATE TABLE customers (
     customer_id INTEGER PRIMARY KEY,
     signup_date DATE,
-    country VARCHAR,
-    age_band VARCHAR,
-    income_band VARCHAR,
-    channel VARCHAR
+    country country,
+    age_band age_band,
+    income_band income_band,
+    channel channel
 );
 
 CREATE TABLE products (
     product_id INTEGER PRIMARY KEY,
     product_name VARCHAR,
-    category VARCHAR,
+    category category,
     price_usd DECIMAL(10,2)
 );
 
@@ -18,14 +28,14 @@ CREATE TABLE orders (
     order_id INTEGER PRIMARY KEY,
     customer_id INTEGER,
     order_ts TIMESTAMP,
-    source VARCHAR,
+    source source,
     revenue_usd DECIMAL(10,2)
 );
 
 CREATE TABLE order_items (
     order_id INTEGER,
     product_id INTEGER,
-    qty INTEGER,
+    qty TINYINT,
     unit_price_usd DECIMAL(10,2)
 );
 
@@ -33,14 +43,18 @@ CREATE TABLE events (
     event_id INTEGER PRIMARY KEY,
     customer_id INTEGER,
     event_ts TIMESTAMP,
-    event_type VARCHAR
+    event_type event_type
 );
 
 CREATE TABLE marketing_experiments (
     exp_id INTEGER PRIMARY KEY,
+    experiment experiment,
     user_id INTEGER,
-    "group" VARCHAR,
+    "group" arm,
     exposed_ts TIMESTAMP,
     converted BOOLEAN,
     conversion_ts TIMESTAMP
 );
+
+CREATE INDEX order_items_order_id_idx ON order_items (order_id);
+CREATE INDEX events_customer_id_idx ON events (customer_id);
@@ -0,0 +1,116 @@
+"""Describe, histogram and pivot on Arrow results without building DataFrames.
+
+The helpers take an Arrow column (``Array`` / ``ChunkedArray``), a ``Table`` or a stream of record
+batches (``warehouse.stream``, ``Table.to_batches``). They work chunk by chunk on the Arrow
+buffers — NumPy views are zero-copy for null-free numeric chunks — and only the small result
+(a summary, bin counts, a pivot) becomes pandas. Decimal columns are cast to float64 first.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Aggregations whose partial results can be merged across batches, and how to merge them
+MERGEABLE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+
+def numeric(values):
+    """``values`` as a float-compatible Arrow array; decimals are cast to float64."""
+    if pa.types.is_decimal(values.type):
+        return pc.cast(values, pa.float64())
+    return values
+
+
+def pandas_schema(schema: pa.Schema) -> pa.Schema:
+    """``schema`` with dictionary indices made signed; DuckDB sends ENUMs with unsigned ones."""
+    return pa.schema([
+        field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        if pa.types.is_dictionary(field.type) and not pa.types.is_signed_integer(field.type.index_type)
+        else field
+        for field in schema
+    ])
+
+
+def pandas_compatible(source):
+    """A table or record batch reader whose ENUM columns ``to_pandas`` can convert to categoricals."""
+    schema = pandas_schema(source.schema)
+    if schema.equals(source.schema):
+        return source
+    if isinstance(source, pa.Table):
+        return source.cast(schema)
+    batches = (batch for raw in source for batch in pa.Table.from_batches([raw]).cast(schema).to_batches())
+    return pa.RecordBatchReader.from_batches(schema, batches)
+
+
+def chunks(values) -> list:
+    return values.chunks if isinstance(values, pa.ChunkedArray) else [values]
+
+
+def to_numpy(chunk: pa.Array) -> np.ndarray:
+    """NumPy view of a chunk; nulls are dropped (a copy only when there are any)."""
+    if chunk.null_count:
+        chunk = chunk.drop_null()
+    return chunk.to_numpy(zero_copy_only=False)
+
+
+def describe(values, percentiles: list = (0.25, 0.5, 0.75)) -> pd.Series:
+    """``Series.describe`` for an Arrow column, computed with Arrow kernels."""
+    values = numeric(values)
+    quantiles = pc.quantile(values, q=list(percentiles), interpolation="linear").to_pylist()
+    bounds = pc.min_max(values)
+    stats = {
+        "count": float(len(values) - values.null_count),
+        "mean": pc.mean(values).as_py(),
+        "std": pc.stddev(values, ddof=1).as_py(),
+        "min": bounds["min"].as_py(),
+        **{f"{p * 100:g}%": q for p, q in zip(percentiles, quantiles)},
+        "max": bounds["max"].as_py(),
+    }
+    return pd.Series(stats, dtype=float)
+
+
+def histogram(source, bins: int = 30, range: tuple = None, column: str = None) -> tuple:
+    """Bin counts and edges, accumulated chunk by chunk.
+
+    ``source`` is an Arrow column, or a table / iterable of record batches with ``column``.
+    A stream is read once, so it needs an explicit ``range``.
+    """
+    if isinstance(source, (pa.Table, pa.RecordBatch)):
+        source = source.column(column)
+    if isinstance(source, (pa.Array, pa.ChunkedArray)):
+        source = numeric(source)
+        if range is None:
+            bounds = pc.min_max(source)
+            range = (bounds["min"].as_py(), bounds["max"].as_py())
+        parts = chunks(source)
+    else:
+        if range is None:
+            raise ValueError("histogram over a stream of batches needs an explicit range")
+        parts = (numeric(batch.column(column)) for batch in source)
+
+    edges = np.histogram_bin_edges([], bins=bins, range=range)
+    counts = np.zeros(bins, dtype=np.int64)
+    for chunk in parts:
+        counts += np.histogram(to_numpy(chunk), bins=edges)[0]
+    return counts, edges
+
+
+def pivot(source, index: str, columns: str, values: str, aggfunc: str = "sum") -> pd.DataFrame:
+    """Aggregate ``values`` by (``index``, ``columns``) and spread ``columns`` wide.
+
+    ``source`` is a table or an iterable of record batches; each batch is aggregated on its own
+    and the partial results merged, so a stream never has to fit in memory.
+    """
+    if aggfunc not in MERGEABLE:
+        raise ValueError(f"aggfunc must be one of {sorted(MERGEABLE)}")
+    keys = [index, columns]
+    batches = source.to_batches() if isinstance(source, pa.Table) else source
+    partials = []
+    for batch in batches:
+        table = pa.Table.from_batches([batch]).select([*keys, values])
+        table = table.set_column(2, values, numeric(table.column(values)))
+        partials.append(table.group_by(keys).aggregate([(values, aggfunc)]))
+    partial = f"{values}_{aggfunc}"
+    merged = pa.concat_tables(partials).group_by(keys).aggregate([(partial, MERGEABLE[aggfunc])])
+    long = merged.to_pandas().rename(columns={f"{partial}_{MERGEABLE[aggfunc]}": values})
+    return long.pivot(index=index, columns=columns, values=values).sort_index().sort_index(axis=1)
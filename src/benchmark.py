@@ -0,0 +1,357 @@
+"""Benchmark the generator functions and the lab queries across scale factors.
+
+Every case runs in a fresh Python process, so peak RSS and timings are not polluted by earlier
+cases. A generator case builds its inputs first and times only the ``generate_*`` call; a query
+case times the lab's SQL (plus the pandas step for the funnel) against a warehouse built at that
+scale factor; an append case folds the next day or hour of orders into that warehouse's rollups
+as deltas and checks them against a rebuild. Results are written as JSON and, with
+``--baseline``, compared against a stored run: a case whose wall time or peak RSS grew by more
+than ``--threshold`` is flagged and the exit status is non-zero. Cases the baseline has no entry
+for are listed rather than skipped silently; re-record the baseline whenever cases or the
+generator change.
+
+Usage:
+    python src/benchmark.py --save-baseline
+    python src/benchmark.py --scale-factors 1 5 --baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+import cohorts
+import distributions
+import experiments
+import funnels
+import generate_data as gd
+import rollups
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = PROJECT_ROOT / "benchmarks" / "baseline.json"
+RESULTS_PATH = PROJECT_ROOT / "reports" / "benchmarks" / "latest.json"
+DEFAULT_SCALE_FACTORS = [1.0, 5.0]
+DEFAULT_THRESHOLD = 0.2
+# Changes smaller than this are timer or allocator noise, whatever the ratio
+MIN_CHANGE = {"wall_s": 0.01, "peak_rss_mb": 5.0}
+SEED = 42
+
+# Generator steps in dependency order: each builds its table from the ones before it
+GENERATOR_CASES = {
+    "generate_customers": lambda rng, data, n, profile: gd.generate_customers(rng, n, profile=profile),
+    "generate_products": lambda rng, data, n, profile: gd.generate_products(rng),
+    "generate_orders": lambda rng, data, n, profile: gd.generate_orders(
+        rng, data["generate_customers"], round(n * gd.ORDERS_PER_CUSTOMER), profile=profile
+    ),
+    "generate_order_items": lambda rng, data, n, profile: gd.generate_order_items(
+        rng, data["generate_orders"], data["generate_products"], profile=profile
+    ),
+    "generate_events": lambda rng, data, n, profile: gd.generate_events(
+        rng, data["generate_customers"], round(n * gd.EVENTS_PER_CUSTOMER), profile=profile
+    ),
+    "generate_marketing_experiments": lambda rng, data, n, profile: gd.generate_marketing_experiments(
+        rng, data["generate_customers"], round(n * gd.PARTICIPANTS_PER_CUSTOMER)
+    ),
+}
+
+FUNNEL_STEPS = ["visit", "signup", "purchase"]
+
+# The labs' queries, as they run them
+QUERY_CASES = {
+    "daily_revenue": "SELECT order_date, revenue_usd AS daily_revenue_usd FROM daily_revenue ORDER BY order_date",
+    "customer_ltv": """
+        SELECT c.customer_id, c.country, c.channel,
+               SUM(cr.orders) AS orders, SUM(cr.revenue_usd) AS revenue_usd
+        FROM customers c
+        JOIN customer_revenue cr USING (customer_id)
+        GROUP BY 1, 2, 3
+        ORDER BY revenue_usd DESC
+    """,
+    "cohort_retention": cohorts.cube_sql(grain="month", basis="first_purchase"),
+    "funnel": f"""
+        SELECT customer_id, event_ts, event_type
+        FROM events
+        WHERE event_type IN ({", ".join(f"'{step}'" for step in FUNNEL_STEPS)})
+    """,
+    "ab_aggregate": """
+        SELECT "group" AS grp,
+               COUNT(*) AS users,
+               SUM(CASE WHEN converted THEN 1 ELSE 0 END) AS converters
+        FROM marketing_experiments
+        GROUP BY 1
+    """,
+    "ab_participants": experiments.PARTICIPANTS_SQL,
+    # a time range and point lookups, which the physical layout and indexes are for
+    "orders_last_month": """
+        SELECT COUNT(*) AS orders, SUM(revenue_usd) AS revenue_usd
+        FROM orders
+        WHERE order_ts >= TIMESTAMP '2024-12-01'
+    """,
+    "customer_events": "SELECT event_ts, event_type FROM events WHERE customer_id = 4242 ORDER BY event_ts",
+    "order_lines": "SELECT product_id, qty, unit_price_usd FROM order_items WHERE order_id = 12345",
+}
+
+# Incremental rollup maintenance: one appended window of orders (``generate_data --append``)
+# folded into the warehouse's rollups with ``rollups.apply_order_batch``
+APPEND_CASES = {"rollup_append_day": "day", "rollup_append_hour": "hour"}
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process; ``ru_maxrss`` survives exec on Linux, so prefer VmHWM there."""
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_generator_case(name: str, scale_factor: float, profile: str = distributions.DEFAULT_PROFILE) -> tuple:
+    """Build the inputs of ``name``, then time it alone; returns (seconds, rows)."""
+    n_customers = max(1, round(scale_factor * gd.CUSTOMERS_PER_SCALE_FACTOR))
+    rng = np.random.default_rng(SEED)
+    data = {}
+    for step, generate in GENERATOR_CASES.items():
+        start = time.perf_counter()
+        data[step] = generate(rng, data, n_customers, profile)
+        elapsed = time.perf_counter() - start
+        if step == name:
+            return elapsed, len(data[step])
+    raise ValueError(f"unknown generator case: {name}")
+
+
+def run_query_case(name: str, database: Path) -> tuple:
+    con = duckdb.connect(str(database), read_only=True)
+    start = time.perf_counter()
+    result = con.execute(QUERY_CASES[name]).fetchdf()
+    if name == "funnel":
+        funnels.funnel_monthly(funnels.funnel_state(result, FUNNEL_STEPS), FUNNEL_STEPS)
+    return time.perf_counter() - start, len(result)
+
+
+def run_append_case(name: str, database: Path, profile: str = distributions.DEFAULT_PROFILE) -> tuple:
+    """Time folding the next window of orders into copies of the rollups; returns (seconds, orders).
+
+    The window continues the benchmark warehouse the way ``--append`` continues a snapshot.
+    Afterwards the rollups are rebuilt from the base tables plus the window and must match, so
+    the delta path cannot drift from ``build_rollups``.
+    """
+    con = duckdb.connect()
+    con.execute(f"ATTACH '{database}' AS warehouse (READ_ONLY)")
+    rollups.create_rollups(con)
+    for table in rollups.DELTAS:
+        con.execute(f"INSERT INTO {table} SELECT * FROM warehouse.{table}")
+    ids = {"customers": "customer_id", "orders": "order_id", "events": "event_id", "marketing_experiments": "exp_id"}
+    next_ids = {table: con.execute(f"SELECT MAX({key}) + 1 FROM warehouse.{table}").fetchone()[0] for table, key in ids.items()}
+    start = gd.END_DATE + pd.Timedelta(days=1)
+    batch = gd.generate_window(
+        gd.shard_rngs(SEED, 0), start, start + gd.APPEND_STEPS[APPEND_CASES[name]], next_ids,
+        (next_ids["customers"] - 1) / gd.HISTORY_DAYS, gd.generate_products(np.random.default_rng(SEED)), profile,
+    )
+    con.register("batch_orders", batch["orders"])
+    con.register("batch_items", batch["order_items"])
+
+    start_s = time.perf_counter()
+    rollups.apply_order_batch(con, "batch_orders", "batch_items")
+    elapsed = time.perf_counter() - start_s
+
+    for table in rollups.DELTAS:
+        con.execute(f"ALTER TABLE {table} RENAME TO {table}_delta")
+    con.execute("""
+        CREATE VIEW orders AS
+        SELECT order_id, customer_id, order_ts FROM warehouse.orders
+        UNION ALL SELECT order_id, customer_id, order_ts FROM batch_orders
+    """)
+    con.execute("""
+        CREATE VIEW order_items AS
+        SELECT order_id, product_id, qty, unit_price_usd FROM warehouse.order_items
+        UNION ALL SELECT order_id, product_id, qty, unit_price_usd FROM batch_items
+    """)
+    rollups.build_rollups(con)
+    for table in rollups.DELTAS:
+        differing = con.execute(f"""
+            SELECT COUNT(*) FROM (
+                (SELECT * FROM {table}_delta EXCEPT ALL SELECT * FROM {table})
+                UNION ALL
+                (SELECT * FROM {table} EXCEPT ALL SELECT * FROM {table}_delta)
+            )
+        """).fetchone()[0]
+        if differing:
+            raise AssertionError(f"{table}: {differing} rows differ between the delta and a rebuild")
+    return elapsed, len(batch["orders"])
+
+
+def build_benchmark_database(scale_factor: float, root: Path, profile: str = distributions.DEFAULT_PROFILE) -> Path:
+    """Generate the full dataset at ``scale_factor`` and ``profile`` and build a warehouse from it."""
+    n_customers = max(1, round(scale_factor * gd.CUSTOMERS_PER_SCALE_FACTOR))
+    products = gd.generate_products(np.random.default_rng(np.random.SeedSequence(SEED)))
+    chunks = [
+        gd.generate_chunk(
+            gd.shard_rngs(SEED, shard["shard_index"]), shard["n_customers"], products, shard["first_ids"], shard["id_dtypes"],
+            profile,
+        )
+        for shard in gd.plan_shards(n_customers, gd.DEFAULT_CHUNK_CUSTOMERS, SEED)
+    ]
+    root.mkdir(parents=True, exist_ok=True)
+    gd.write_table(products, root / "products.parquet", "parquet")
+    for table in chunks[0]:
+        gd.write_table(pd.concat([chunk[table] for chunk in chunks], ignore_index=True), root / f"{table}.parquet", "parquet")
+    database = root / "warehouse.duckdb"
+    gd.build_database(root, database, "parquet")
+    return database
+
+
+def run_case_in_process(
+    case: str, scale_factor: float, database: Path = None, profile: str = distributions.DEFAULT_PROFILE
+) -> dict:
+    """Run one case in a fresh interpreter and return its measurements."""
+    cmd = [sys.executable, __file__, "--run-case", case, "--scale-factors", str(scale_factor), "--profile", profile]
+    if database:
+        cmd += ["--database", str(database)]
+    completed = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_benchmarks(cases: list, scale_factors: list, repeats: int, profile: str = distributions.DEFAULT_PROFILE) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale_factor in scale_factors:
+            database = None
+            if any(case in QUERY_CASES or case in APPEND_CASES for case in cases):
+                database = build_benchmark_database(scale_factor, Path(tmp) / f"sf{scale_factor}", profile)
+            for case in cases:
+                runs = [
+                    run_case_in_process(
+                        case, scale_factor, database if case in QUERY_CASES or case in APPEND_CASES else None, profile
+                    )
+                    for _ in range(repeats)
+                ]
+                wall_s = min(run["wall_s"] for run in runs)
+                rows = runs[0]["rows"]
+                results.append({
+                    "case": case,
+                    "scale_factor": scale_factor,
+                    "rows": rows,
+                    "wall_s": round(wall_s, 4),
+                    "rows_per_s": round(rows / wall_s) if wall_s else None,
+                    "peak_rss_mb": round(max(run["peak_rss_mb"] for run in runs), 1),
+                })
+                print(
+                    f"{case:<32} SF{scale_factor:<6g} {rows:>10,} rows {wall_s:>9.4f}s "
+                    f"{results[-1]['peak_rss_mb']:>8.1f} MB"
+                )
+    return results
+
+
+def compare(results: list, baseline: list, threshold: float) -> list:
+    """Cases whose wall time or peak RSS exceeds the baseline by more than ``threshold``.
+
+    Increases below ``MIN_CHANGE`` are ignored so millisecond cases do not flap.
+    """
+    reference = {(entry["case"], entry["scale_factor"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        base = reference.get((entry["case"], entry["scale_factor"]))
+        if base is None:
+            continue
+        for metric in ["wall_s", "peak_rss_mb"]:
+            increase = entry[metric] - base[metric]
+            if base[metric] and increase > base[metric] * threshold and increase > MIN_CHANGE[metric]:
+                regressions.append({
+                    "case": entry["case"],
+                    "scale_factor": entry["scale_factor"],
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": entry[metric],
+                    "change": round(entry[metric] / base[metric] - 1, 3),
+                })
+    return regressions
+
+
+def missing_from_baseline(results: list, baseline: list) -> list:
+    """Cases measured now that the baseline has no entry for, so ``compare`` cannot check them."""
+    reference = {(entry["case"], entry["scale_factor"]) for entry in baseline}
+    return [
+        {"case": entry["case"], "scale_factor": entry["scale_factor"]}
+        for entry in results
+        if (entry["case"], entry["scale_factor"]) not in reference
+    ]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale-factors", type=float, nargs="+", default=DEFAULT_SCALE_FACTORS)
+    parser.add_argument(
+        "--cases", nargs="+", choices=[*GENERATOR_CASES, *QUERY_CASES, *APPEND_CASES],
+        default=[*GENERATOR_CASES, *QUERY_CASES, *APPEND_CASES],
+    )
+    parser.add_argument(
+        "--profile", choices=distributions.PROFILES, default=distributions.DEFAULT_PROFILE,
+        help="generator distribution profile; skewed data exposes join and group-by hot spots (default: %(default)s)",
+    )
+    parser.add_argument("--repeats", type=int, default=3, help="fresh-process runs per case; the fastest counts")
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH)
+    parser.add_argument("--baseline", type=Path, help="earlier results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write the results to {BASELINE_PATH}")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, e.g. 0.2 = 20%%")
+    # internal: run a single case in this process and print its measurements
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--database", type=Path, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.run_case:
+        if args.run_case in QUERY_CASES:
+            wall_s, rows = run_query_case(args.run_case, args.database)
+        elif args.run_case in APPEND_CASES:
+            wall_s, rows = run_append_case(args.run_case, args.database, args.profile)
+        else:
+            wall_s, rows = run_generator_case(args.run_case, args.scale_factors[0], args.profile)
+        print(json.dumps({"wall_s": wall_s, "rows": rows, "peak_rss_mb": peak_rss_mb()}))
+        return
+
+    results = run_benchmarks(args.cases, args.scale_factors, args.repeats, args.profile)
+    report = {
+        "profile": args.profile,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "duckdb": duckdb.__version__,
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "results": results,
+    }
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        report["regressions"] = compare(results, baseline["results"], args.threshold)
+        report["missing_from_baseline"] = missing_from_baseline(results, baseline["results"])
+        if baseline.get("profile") != args.profile:
+            print(f"WARNING baseline was recorded with profile {baseline.get('profile')!r}, not {args.profile!r}")
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.save_baseline:
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(report, indent=2) + "\n")
+
+    for missing in report.get("missing_from_baseline", []):
+        print(f"NOT IN BASELINE {missing['case']} SF{missing['scale_factor']:g}: re-record with --save-baseline")
+    for regression in report.get("regressions", []):
+        print(
+            f"REGRESSION {regression['case']} SF{regression['scale_factor']:g} {regression['metric']}: "
+            f"{regression['baseline']} -> {regression['current']} (+{regression['change']:.0%})"
+        )
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
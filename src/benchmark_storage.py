@@ -0,0 +1,97 @@
+"""Compare CSV and Parquet synthetic output on disk size and DuckDB load time.
+
+Usage: python src/benchmark_storage.py --scale-factor 5
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+
+from generate_data import (
+    CUSTOMERS_PER_SCALE_FACTOR,
+    DEFAULT_CHUNK_CUSTOMERS,
+    TABLES,
+    generate_chunk,
+    generate_products,
+    plan_shards,
+    shard_rngs,
+    write_partition,
+)
+
+LAYOUTS = {
+    "csv": {"fmt": "csv", "partition_by_month": False},
+    "parquet": {"fmt": "parquet", "partition_by_month": False},
+    "parquet_by_month": {"fmt": "parquet", "partition_by_month": True},
+}
+
+
+def write_layouts(root: Path, scale_factor: float, seed: int):
+    """Generate the dataset once and write every layout from the same shards."""
+    n_customers = max(1, round(scale_factor * CUSTOMERS_PER_SCALE_FACTOR))
+    products = generate_products(np.random.default_rng(np.random.SeedSequence(seed)))
+    for layout, options in LAYOUTS.items():
+        write_partition({"products": products}, root / layout, 0, options["fmt"])
+    for shard in plan_shards(n_customers, DEFAULT_CHUNK_CUSTOMERS, seed):
+        chunk = generate_chunk(shard_rngs(seed, shard["shard_index"]), shard["n_customers"], products, shard["first_ids"])
+        for layout, options in LAYOUTS.items():
+            write_partition(chunk, root / layout, shard["shard_index"], **options)
+
+
+def reader(layout_dir: Path, table: str, fmt: str) -> str:
+    pattern = layout_dir / table / "**" / f"*.{fmt}"
+    if fmt == "parquet":
+        return f"read_parquet('{pattern}', hive_partitioning = true)"
+    return f"read_csv('{pattern}', header = true)"
+
+
+def time_best(con: duckdb.DuckDBPyConnection, sql: str, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        con.execute(sql).fetchall()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def benchmark_layout(layout_dir: Path, fmt: str, repeats: int) -> dict:
+    con = duckdb.connect(database=":memory:")
+    load_s = 0.0
+    for table in TABLES:
+        load_s += time_best(
+            con, f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM {reader(layout_dir, table, fmt)}", repeats
+        )
+    # a narrow scan straight off the files shows what column pruning saves
+    scan_s = time_best(
+        con,
+        f"SELECT date_trunc('month', order_ts), SUM(revenue_usd) FROM {reader(layout_dir, 'orders', fmt)} GROUP BY 1",
+        repeats,
+    )
+    size_mb = sum(f.stat().st_size for f in layout_dir.rglob("*") if f.is_file()) / 1e6
+    return {"size_mb": size_mb, "load_s": load_s, "orders_month_scan_s": scan_s}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale-factor", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_layouts(root, args.scale_factor, args.seed)
+        print(f"Scale factor {args.scale_factor} (best of {args.repeats})")
+        print("| layout | size MB | load all tables s | orders month scan s |")
+        print("|---|---:|---:|---:|")
+        for layout, options in LAYOUTS.items():
+            result = benchmark_layout(root / layout, options["fmt"], args.repeats)
+            print(
+                f"| {layout} | {result['size_mb']:.1f} | {result['load_s']:.3f} | {result['orders_month_scan_s']:.3f} |"
+            )
+
+
+if __name__ == "__main__":
+    main()
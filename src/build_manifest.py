@@ -0,0 +1,49 @@
+"""Fingerprints and manifests for incremental builds.
+
+A manifest is a small JSON file mapping a build step to the fingerprint of the inputs it last
+ran with. A step whose fingerprint is unchanged (and whose outputs still exist) can be skipped.
+Source files are hashed by content, including the ``src/`` modules they import, so editing a
+shared helper invalidates every step that uses it.
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent
+
+
+def local_imports(path: Path) -> list:
+    """``src/`` modules imported by ``path``, followed transitively."""
+    seen, pending = [], [path]
+    while pending:
+        text = pending.pop().read_text()
+        for name in re.findall(r"^\s*(?:from|import)\s+(\w+)", text, flags=re.MULTILINE):
+            module = SRC_DIR / f"{name}.py"
+            if module.exists() and module not in seen:
+                seen.append(module)
+                pending.append(module)
+    return sorted(seen)
+
+
+def source_hash(path: Path) -> str:
+    """Hash of ``path`` and every ``src/`` module it depends on."""
+    digest = hashlib.sha256()
+    for file in [path, *local_imports(path)]:
+        digest.update(file.name.encode())
+        digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+def fingerprint(*parts) -> str:
+    """Stable hash of JSON-serializable inputs."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def load(path: Path) -> dict:
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def save(path: Path, manifest: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
@@ -0,0 +1,116 @@
+"""Cohort cube: customers and revenue per (cohort, period offset, segment).
+
+``build_cohort_cube`` fills the ``cohort_cube`` table in a single aggregation over ``orders``
+covering every grain (day, week, month), both cohort definitions (``first_purchase`` and
+``signup``) and the overall, per-country and per-channel segments. A ``NULL`` country or channel
+means "all". Offsets are whole grains since the cohort start, so retention heatmaps at any grain
+or segment are a filter and a pivot away, without touching ``orders`` again.
+"""
+import duckdb
+import pandas as pd
+
+GRAINS = ["day", "week", "month"]
+COHORT_BASES = ["first_purchase", "signup"]
+SEGMENTS = ["country", "channel"]
+
+CUBE_SCHEMA = f"""
+CREATE TYPE cohort_basis AS ENUM ({", ".join(f"'{b}'" for b in COHORT_BASES)});
+CREATE TYPE cohort_grain AS ENUM ({", ".join(f"'{g}'" for g in GRAINS)});
+CREATE TABLE cohort_cube (
+    basis cohort_basis,
+    grain cohort_grain,
+    cohort DATE,
+    period_offset SMALLINT,
+    country country,
+    channel channel,
+    customers INTEGER,
+    revenue_usd DECIMAL(18,2)
+);
+"""
+
+# Base tables the cube is derived from
+SOURCES = {"cohort_cube": ["orders", "customers"]}
+
+CUBE_SQL = f"""
+WITH grains AS (
+    SELECT UNNEST([{", ".join(f"'{g}'" for g in GRAINS)}]) AS grain
+), customer_periods AS (
+    SELECT g.grain,
+           o.customer_id,
+           CAST(date_trunc(g.grain, o.order_ts) AS DATE) AS period,
+           SUM(o.revenue_usd) AS revenue_usd
+    FROM orders o
+    CROSS JOIN grains g
+    GROUP BY 1, 2, 3
+), cohorted AS (
+    SELECT b.basis,
+           cp.grain,
+           cp.customer_id,
+           cp.period,
+           cp.revenue_usd,
+           c.country,
+           c.channel,
+           CASE b.basis
+               WHEN 'signup' THEN CAST(date_trunc(cp.grain, c.signup_date) AS DATE)
+               ELSE MIN(cp.period) OVER (PARTITION BY cp.grain, cp.customer_id)
+           END AS cohort
+    FROM customer_periods cp
+    JOIN customers c USING (customer_id)
+    CROSS JOIN (SELECT UNNEST([{", ".join(f"'{b}'" for b in COHORT_BASES)}]) AS basis) b
+), offsets AS (
+    SELECT *, date_diff(grain, cohort, period) AS period_offset
+    FROM cohorted
+)
+SELECT basis,
+       grain,
+       cohort,
+       period_offset,
+       country,
+       channel,
+       COUNT(*) AS customers,
+       SUM(revenue_usd) AS revenue_usd
+FROM offsets
+GROUP BY GROUPING SETS (
+    (basis, grain, cohort, period_offset),
+    (basis, grain, cohort, period_offset, country),
+    (basis, grain, cohort, period_offset, channel)
+)
+"""
+
+
+def build_cohort_cube(con: duckdb.DuckDBPyConnection):
+    """(Re)build ``cohort_cube`` from ``orders`` and ``customers``.
+
+    Each customer has one row per period they ordered in, so ``COUNT(*)`` per cell is the
+    number of distinct active customers.
+    """
+    con.execute("DROP TABLE IF EXISTS cohort_cube")
+    con.execute("DROP TYPE IF EXISTS cohort_basis")
+    con.execute("DROP TYPE IF EXISTS cohort_grain")
+    con.execute(CUBE_SCHEMA)
+    con.execute(f"""
+        INSERT INTO cohort_cube
+        SELECT * FROM ({CUBE_SQL})
+        ORDER BY basis, grain, country NULLS FIRST, channel NULLS FIRST, cohort, period_offset
+    """)
+
+
+def cube_sql(grain: str = "month", basis: str = "first_purchase", segment: str = None) -> str:
+    """SQL selecting one slice of the cube; with ``segment`` the rows keep that column."""
+    if grain not in GRAINS or basis not in COHORT_BASES or segment not in [None, *SEGMENTS]:
+        raise ValueError(f"unknown cube slice: grain={grain!r}, basis={basis!r}, segment={segment!r}")
+    filters = [f"basis = '{basis}'", f"grain = '{grain}'"]
+    filters += [f"{s} IS NOT NULL" if s == segment else f"{s} IS NULL" for s in SEGMENTS]
+    columns = ["cohort", "period_offset", *([segment] if segment else []), "customers", "revenue_usd"]
+    return (
+        f"SELECT {', '.join(columns)} FROM cohort_cube WHERE {' AND '.join(filters)} "
+        f"ORDER BY {', '.join(columns[:-2])}"
+    )
+
+
+def cohort_matrix(cube: pd.DataFrame, values: str = "customers", normalize: bool = False) -> pd.DataFrame:
+    """Pivot a cube slice to cohort x period offset; ``normalize`` divides by the offset-0 column."""
+    matrix = cube.pivot_table(index="cohort", columns="period_offset", values=values, aggfunc="sum").fillna(0)
+    if normalize:
+        matrix = matrix.divide(matrix[0], axis=0)
+    return matrix
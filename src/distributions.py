@@ -0,0 +1,120 @@
+"""Distribution profiles for the generator: popularity skew, seasonality and campaign spikes.
+
+A profile names how skewed the generated data is:
+
+- ``customer_zipf`` / ``product_zipf``: Zipf exponents for how often a customer orders and how
+  often a product is picked (0 = no skew). Customer ranks are a random permutation; products
+  are ranked by price, cheapest first.
+- ``weekly``: Monday-to-Sunday multipliers for signups, orders and events.
+- ``holidays``: ``(first "MM-DD", last "MM-DD", multiplier)`` windows repeated every year.
+- ``campaigns``: ``(start date, days, peak multiplier)`` spikes that decay linearly to 1.
+
+Weighted choices among many items use Vose alias tables, built once in O(n) and drawn in O(1)
+(one integer and one uniform per draw). Dates are drawn by guide-table inverse-CDF lookups
+over the per-day weights, which also handles "a day on or after signup" by starting the uniform at the
+CDF of the signup day.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_PROFILE = "uniform"
+# Guide-table resolution of ``sample_days``; more buckets mean fewer forward steps per draw
+GUIDE_BUCKETS_PER_DAY = 4
+
+SEASONALITY = {
+    "weekly": [1.1, 1.05, 1.0, 1.0, 1.05, 0.8, 0.7],
+    "holidays": [("11-24", "11-30", 2.5), ("12-15", "12-24", 1.6), ("01-01", "01-01", 0.5)],
+    "campaigns": [("2023-05-08", 14, 3.0), ("2024-03-11", 10, 4.0), ("2024-09-02", 21, 2.0)],
+}
+
+PROFILES = {
+    "uniform": {"customer_zipf": 0.0, "product_zipf": 0.0, "weekly": [1.0] * 7, "holidays": [], "campaigns": []},
+    "seasonal": {"customer_zipf": 0.0, "product_zipf": 0.0, **SEASONALITY},
+    "skewed": {"customer_zipf": 1.1, "product_zipf": 1.0, **SEASONALITY},
+}
+
+
+def alias_table(weights) -> tuple:
+    """Vose alias table ``(prob, alias)`` for sampling indices in proportion to ``weights``.
+
+    Vose pairs each under-full column with an over-full one that donates the rest of its
+    height. Here a whole round of pairings is done at once: laying the deficits of the small
+    columns end to end against the surpluses of the large ones, each small column takes the
+    large one its deficit starts in, which still holds more than 1 at that point. Large
+    columns pushed below 1 become small for the next round; a few rounds cover any weights.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    scaled = weights * (len(weights) / weights.sum())
+    prob = np.ones(len(weights))
+    alias = np.arange(len(weights))
+    small = np.flatnonzero(scaled < 1)
+    large = np.flatnonzero(scaled >= 1)
+    while len(small) and len(large):
+        deficit = 1 - scaled[small]
+        donor = np.searchsorted(np.cumsum(scaled[large] - 1), np.cumsum(deficit) - deficit, side="right")
+        donor = np.minimum(donor, len(large) - 1)
+        prob[small], alias[small] = scaled[small], large[donor]
+        scaled[large] -= np.bincount(donor, weights=deficit, minlength=len(large))
+        small, large = large[scaled[large] < 1], large[scaled[large] >= 1]
+    # whatever is left is 1 up to rounding and keeps prob 1
+    return prob, alias
+
+
+def alias_sample(rng: np.random.Generator, table: tuple, size: int) -> np.ndarray:
+    prob, alias = table
+    picked = rng.integers(0, len(prob), size=size)
+    return np.where(rng.random(size) < prob[picked], picked, alias[picked])
+
+
+def zipf_weights(n: int, exponent: float) -> np.ndarray:
+    """Weight of ranks ``1..n`` under Zipf's law; all ones when ``exponent`` is 0."""
+    return 1.0 / np.arange(1, n + 1) ** exponent
+
+
+def day_weights(start: pd.Timestamp, end: pd.Timestamp, profile: str = DEFAULT_PROFILE) -> np.ndarray:
+    """Relative volume of every day in ``[start, end]`` under ``profile``."""
+    settings = PROFILES[profile]
+    days = pd.date_range(start.normalize(), end.normalize(), freq="D")
+    weights = np.asarray(settings["weekly"], dtype=np.float64)[days.dayofweek]
+    month_day = days.strftime("%m-%d")
+    for first, last, lift in settings["holidays"]:
+        weights[(month_day >= first) & (month_day <= last)] *= lift
+    for first_day, length, peak in settings["campaigns"]:
+        offset = (days - pd.Timestamp(first_day)).days.to_numpy()
+        active = (offset >= 0) & (offset < length)
+        weights[active] *= 1 + (peak - 1) * (1 - offset[active] / length)
+    return weights
+
+
+def sample_days(rng: np.random.Generator, weights: np.ndarray, size: int, first=0) -> np.ndarray:
+    """Day offsets drawn in proportion to ``weights``, each on or after its ``first`` offset.
+
+    ``first`` is a scalar or one offset per draw; the draw is the inverse CDF of a uniform
+    taken between the CDF just before ``first`` and 1. A guide table maps each of
+    ``GUIDE_BUCKETS_PER_DAY`` buckets per day to its first candidate day, so the lookup is a
+    gather plus a step or two forward instead of a binary search. When no day from ``first`` on
+    has any weight, the draw is the last day.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if not (np.isfinite(weights).all() and (weights >= 0).all() and weights.sum() > 0):
+        raise ValueError("day weights must be finite, non-negative and not all zero")
+    cdf = np.cumsum(weights)
+    cdf /= cdf[-1]
+    buckets = GUIDE_BUCKETS_PER_DAY * len(weights)
+    guide = np.searchsorted(cdf, np.arange(buckets) / buckets, side="right")
+    before = np.concatenate([[0.0], cdf[:-1]])[first]
+    uniform = before + rng.random(size) * (1 - before)
+    days = guide[np.minimum((uniform * buckets).astype(np.int64), buckets - 1)]
+    # only days before the last can still move forward; a uniform of 1 (no weight left after
+    # ``first``) would otherwise never find a day whose CDF exceeds it
+    last = len(cdf) - 1
+    behind = np.flatnonzero((cdf[days] <= uniform) & (days < last))
+    while len(behind):
+        days[behind] += 1
+        behind = behind[(cdf[days[behind]] <= uniform[behind]) & (days[behind] < last)]
+    return days
+
+
+def volume_factor(day: pd.Timestamp, start: pd.Timestamp, end: pd.Timestamp, profile: str = DEFAULT_PROFILE) -> float:
+    """Weight of ``day`` relative to the average day of ``[start, end]``."""
+    return float(day_weights(day, day, profile)[0] / day_weights(start, end, profile).mean())
@@ -0,0 +1,213 @@
+"""Streaming sequential analysis of ``marketing_experiments``.
+
+Exposures are consumed in ``exposed_ts`` order as record batches. The state keeps only the
+sufficient statistics per (experiment, arm) — users and conversions — plus the running result of
+each comparison, so memory is O(arms) and a check never rescans the table.
+
+Every non-control arm is compared with the experiment's control (the first arm, ``A``) using the
+normal-approximation mixture SPRT (mSPRT) with a ``N(0, mixing_sd^2)`` mixing distribution over
+the difference in conversion rates. After each batch the always-valid p-value is the running
+minimum of ``1 / likelihood ratio`` and the confidence sequence is the running intersection of
+the mSPRT intervals, so both stay valid however often they are looked at and the test can be
+stopped as soon as the p-value drops below ``alpha``. No correction is applied across arms.
+
+Conversions are attributed at exposure time, as the table records them.
+
+``bootstrap_metrics`` complements the test with Poisson-bootstrap intervals for conversion,
+revenue per user and days to conversion, optionally CUPED-adjusted with each participant's
+order revenue before exposure as the covariate.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+import bootstrap
+import warehouse
+
+DEFAULT_ALPHA = 0.05
+# Prior scale of plausible lifts in conversion rate; smaller values favour detecting small lifts
+MIXING_SD = 0.03
+DEFAULT_BATCH_ROWS = 1000
+
+EXPOSURES_SQL = """
+    SELECT experiment, "group", converted
+    FROM marketing_experiments
+    ORDER BY exposed_ts, exp_id
+"""
+
+# One row per exposure: outcomes after it and order revenue before it (the CUPED covariate)
+PARTICIPANTS_SQL = """
+    SELECT m.exp_id,
+           m.experiment,
+           m."group" AS arm,
+           CAST(m.converted AS INTEGER) AS converted,
+           date_diff('day', m.exposed_ts, m.conversion_ts) AS days_to_conversion,
+           COALESCE(SUM(o.revenue_usd) FILTER (WHERE o.order_ts >= m.exposed_ts), 0) AS revenue_usd,
+           COALESCE(SUM(o.revenue_usd) FILTER (WHERE o.order_ts < m.exposed_ts), 0) AS pre_revenue_usd
+    FROM marketing_experiments m
+    LEFT JOIN orders o ON o.customer_id = m.user_id
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+# Metric name -> participant column; days_to_conversion only exists for converters
+METRICS = {
+    "conversion": "converted",
+    "revenue_per_user": "revenue_usd",
+    "days_to_conversion": "days_to_conversion",
+}
+COVARIATE = "pre_revenue_usd"
+
+
+def exposure_batches(batch_rows: int = DEFAULT_BATCH_ROWS):
+    """Yield ``marketing_experiments`` as Arrow record batches in exposure order."""
+    yield from warehouse.stream(EXPOSURES_SQL, batch_rows)
+
+
+def empty_state(alpha: float = DEFAULT_ALPHA, mixing_sd: float = MIXING_SD) -> dict:
+    return {"alpha": alpha, "mixing_sd": mixing_sd, "exposures": 0, "arms": {}, "tests": {}}
+
+
+def msprt(control: list, treatment: list, alpha: float, mixing_sd: float) -> tuple:
+    """Difference in rates, ``1 / likelihood ratio`` and the (1 - alpha) interval half-width.
+
+    ``control`` and ``treatment`` are ``[users, conversions]``; returns ``None`` while the
+    variance of the difference is still zero.
+    """
+    (n0, c0), (n1, c1) = control, treatment
+    p0, p1 = c0 / n0, c1 / n1
+    variance = p0 * (1 - p0) / n0 + p1 * (1 - p1) / n1
+    if variance == 0:
+        return None
+    delta = p1 - p0
+    tau2 = mixing_sd ** 2
+    log_lr = 0.5 * math.log(variance / (variance + tau2)) + delta ** 2 * tau2 / (2 * variance * (variance + tau2))
+    half_width = math.sqrt(
+        variance * (variance + tau2) / tau2 * (math.log((variance + tau2) / variance) - 2 * math.log(alpha))
+    )
+    return delta, min(1.0, math.exp(-log_lr)), half_width
+
+
+def update_state(state: dict, batch) -> dict:
+    """Fold a batch (Arrow record batch or DataFrame) into ``state`` in place and return it."""
+    frame = batch.to_pandas() if hasattr(batch, "to_pandas") else batch
+    counts = frame.groupby(["experiment", "group"], observed=True)["converted"].agg(["size", "sum"])
+    for (experiment, arm), (users, conversions) in counts.iterrows():
+        stats = state["arms"].setdefault(experiment, {}).setdefault(arm, [0, 0])
+        stats[0] += int(users)
+        stats[1] += int(conversions)
+    state["exposures"] += len(frame)
+
+    for experiment in counts.index.unique(level="experiment"):
+        arms = state["arms"][experiment]
+        control = min(arms)
+        for arm in sorted(arms):
+            if arm == control:
+                continue
+            test = state["tests"].setdefault(
+                (experiment, arm), {"p_value": 1.0, "ci_low": -math.inf, "ci_high": math.inf}
+            )
+            result = msprt(arms[control], arms[arm], state["alpha"], state["mixing_sd"])
+            if result is None:
+                continue
+            delta, p_value, half_width = result
+            test["lift"] = delta
+            test["p_value"] = min(test["p_value"], p_value)
+            test["ci_low"] = max(test["ci_low"], delta - half_width)
+            test["ci_high"] = min(test["ci_high"], delta + half_width)
+    return state
+
+
+def summary(state: dict) -> pd.DataFrame:
+    """One row per (experiment, arm) with its rate and, for treatments, the sequential test."""
+    rows = []
+    for experiment, arms in sorted(state["arms"].items()):
+        for arm, (users, conversions) in sorted(arms.items()):
+            test = state["tests"].get((experiment, arm), {})
+            rows.append({
+                "experiment": experiment,
+                "arm": arm,
+                "users": users,
+                "conversions": conversions,
+                "rate": conversions / users,
+                "lift": test.get("lift", math.nan),
+                "p_value": test.get("p_value", math.nan),
+                "ci_low": test.get("ci_low", math.nan),
+                "ci_high": test.get("ci_high", math.nan),
+                "significant": test.get("p_value", 1.0) < state["alpha"],
+            })
+    return pd.DataFrame(rows)
+
+
+def sequential_results(batches, alpha: float = DEFAULT_ALPHA, mixing_sd: float = MIXING_SD):
+    """Yield ``(exposures so far, summary)`` after every batch of the stream."""
+    state = empty_state(alpha, mixing_sd)
+    for batch in batches:
+        update_state(state, batch)
+        yield state["exposures"], summary(state)
+
+
+def participant_metrics() -> pd.DataFrame:
+    return warehouse.query(PARTICIPANTS_SQL)
+
+
+def bootstrap_metrics(
+    participants: pd.DataFrame,
+    metrics: dict = METRICS,
+    n_resamples: int = bootstrap.DEFAULT_RESAMPLES,
+    alpha: float = DEFAULT_ALPHA,
+    cuped: bool = True,
+    seed: int = 42,
+    workers: int = None,
+) -> pd.DataFrame:
+    """Bootstrap CIs per (experiment, metric, arm), plus the lift over the control arm.
+
+    With ``cuped`` each metric is adjusted as ``y - theta * (x - mean(x))``, where ``x`` is
+    pre-exposure revenue and ``theta`` is estimated on the whole experiment. The adjustment is
+    linear in the resampled sums of ``y`` and ``x``, so it costs nothing extra per resample.
+    ``workers`` defaults to the lab's thread budget (``warehouse.thread_budget``).
+    """
+    workers = workers or warehouse.thread_budget()
+    quantiles = [alpha / 2, 1 - alpha / 2]
+    rows = []
+    # the control is the experiment's first arm, whether or not it has rows left for a metric
+    controls = participants.groupby("experiment", observed=True)["arm"].min()
+    cases = [(e, m, c) for e in sorted(participants["experiment"].unique()) for m, c in metrics.items()]
+    for experiment, metric, column in cases:
+        data = participants.loc[participants["experiment"] == experiment, ["arm", column, COVARIATE]].dropna()
+        if data.empty:
+            continue
+        y, x = data[column].to_numpy(dtype=float), data[COVARIATE].to_numpy(dtype=float)
+        theta = bootstrap.cuped_theta(y, x) if cuped else 0.0
+        x_mean = x.mean()
+
+        arms = sorted(data["arm"].unique())
+        resampled, case_rows = {}, []
+        for arm in arms:
+            in_arm = (data["arm"] == arm).to_numpy()
+            sums, weights = bootstrap.poisson_bootstrap(
+                np.column_stack([y[in_arm], x[in_arm]]), n_resamples,
+                seed=[seed, len(rows) + len(case_rows)], workers=workers,
+            )
+            resampled[arm] = (sums[:, 0] - theta * (sums[:, 1] - weights * x_mean)) / weights
+            estimate = y[in_arm].mean() - theta * (x[in_arm].mean() - x_mean)
+            case_rows.append({
+                "experiment": experiment,
+                "metric": metric,
+                "arm": arm,
+                "users": int(in_arm.sum()),
+                "estimate": estimate,
+                "ci_low": np.quantile(resampled[arm], quantiles[0]),
+                "ci_high": np.quantile(resampled[arm], quantiles[1]),
+            })
+        # an arm can have no rows left (no converters for days_to_conversion); without the
+        # control there is nothing to compare against, so no arm gets a lift
+        control = next((row for row in case_rows if row["arm"] == controls[experiment]), None)
+        for row in case_rows if control is not None else []:
+            if row is control:
+                continue
+            lift = resampled[row["arm"]] - resampled[control["arm"]]
+            row["lift"] = row["estimate"] - control["estimate"]
+            row["lift_ci_low"], row["lift_ci_high"] = np.quantile(lift, quantiles)
+        rows += case_rows
+    return pd.DataFrame(rows)
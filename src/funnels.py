@@ -0,0 +1,65 @@
+"""Ordered funnels computed in one pass over ``events``.
+
+A customer enters the funnel at their first event of the first step and reaches each later step
+with the first matching event at or after the previous step (same-day events count, since the
+data is day-grained). With a conversion ``window``, later steps must also happen within that
+long of the entry.
+
+The result is a per-customer state frame with one timestamp column per step (``NaT`` where the
+step was not reached). Passing it back in with a batch of newer events advances it, so appended
+events update the funnel without rereading history. Batches are assumed to be no older than the
+events already folded in.
+"""
+import pandas as pd
+
+
+def step_columns(steps: list) -> list:
+    return [f"{step}_ts" for step in steps]
+
+
+def empty_state(steps: list) -> pd.DataFrame:
+    state = pd.DataFrame({column: pd.Series(dtype="datetime64[ns]") for column in step_columns(steps)})
+    state.index.name = "customer_id"
+    return state
+
+
+def funnel_state(
+    events: pd.DataFrame, steps: list, window: pd.Timedelta = None, state: pd.DataFrame = None
+) -> pd.DataFrame:
+    """Fold ``events`` (customer_id, event_ts, event_type) into the funnel state for ``steps``."""
+    columns = step_columns(steps)
+    state = empty_state(steps) if state is None else state.copy()
+    events = events.loc[events["event_type"].isin(steps), ["customer_id", "event_ts", "event_type"]]
+    events = events.assign(event_ts=pd.to_datetime(events["event_ts"]).astype("datetime64[ns]"))
+
+    for i, (step, column) in enumerate(zip(steps, columns)):
+        hits = events.loc[events["event_type"] == step, ["customer_id", "event_ts"]]
+        if i == 0:
+            hits = hits[~hits["customer_id"].isin(state.index[state[column].notna()])]
+        else:
+            # only customers waiting on this step can advance, and only with later events
+            waiting = pd.DataFrame({"entry_ts": state[columns[0]], "previous_ts": state[columns[i - 1]]})
+            waiting = waiting[waiting["previous_ts"].notna() & state[column].isna()]
+            hits = hits.join(waiting, on="customer_id", how="inner")
+            keep = hits["event_ts"] >= hits["previous_ts"]
+            if window is not None:
+                keep &= hits["event_ts"] <= hits["entry_ts"] + window
+            hits = hits[keep]
+        first = hits.groupby("customer_id")["event_ts"].min()
+        if i == 0:
+            state = state.reindex(state.index.union(first.index))
+        state.loc[first.index, column] = first
+    return state
+
+
+def funnel_totals(state: pd.DataFrame, steps: list) -> dict:
+    """Customers reaching each step."""
+    return {step: int(state[column].notna().sum()) for step, column in zip(steps, step_columns(steps))}
+
+
+def funnel_monthly(state: pd.DataFrame, steps: list) -> pd.DataFrame:
+    """Customers reaching each step, by month of funnel entry."""
+    columns = step_columns(steps)
+    month = state[columns[0]].dt.to_period("M").dt.to_timestamp().rename("month")
+    monthly = state[columns].groupby(month).count()
+    return monthly.rename(columns=dict(zip(columns, steps))).reset_index()
@@ -1,10 +1,22 @@
+import argparse
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import duckdb
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import build_manifest
+import cohorts
+import distributions
+import rollups
 from faker import Faker
 from pathlib import Path
-from datetime import datetime, timedelta
+from string import ascii_uppercase
 
-np.random.seed(42)
 fake = Faker()
 Faker.seed(42)
 
@@ -13,6 +25,8 @@ DATA_DIR = BASE_DIR / "data"
 SAMPLES_DIR = DATA_DIR / "samples"
 SYNTHETIC_DIR = DATA_DIR / "synthetic"
 SQL_DIR = BASE_DIR / "sql"
+DATABASE_PATH = DATA_DIR / "warehouse.duckdb"
+MANIFEST_PATH = DATA_DIR / "generator_manifest.json"
 
 SAMPLES_DIR.mkdir(parents=True, exist_ok=True)
 SYNTHETIC_DIR.mkdir(parents=True, exist_ok=True)
@@ -20,48 +34,168 @@ SQL_DIR.mkdir(parents=True, exist_ok=True)
 
 END_DATE = pd.Timestamp("2024-12-31")
 START_DATE = END_DATE - pd.DateOffset(months=24)
-
-
-def random_dates(start: pd.Timestamp, end: pd.Timestamp, n: int) -> pd.Series:
-    delta = (end - start).days
-    return start + pd.to_timedelta(np.random.randint(0, delta + 1, size=n), unit="D")
-
-
-def generate_customers(n_customers: int = 20000) -> pd.DataFrame:
-    """Create the core customer dimension with spec-aligned categories."""
-
-    countries = ["CO", "US", "MX", "AR", "CL", "PE", "BR", "ES"]
-    age_bands = ["18-24", "25-34", "35-44", "45-54", "55-64", "65+"]
-    income_bands = ["<1k", "1-2k", "2-4k", "4-6k", "6-10k", "10k+"]
-    channels = ["organic", "paid", "referral", "partner"]
-
-    signup_dates = random_dates(START_DATE, END_DATE, n_customers)
+HISTORY_DAYS = (END_DATE - START_DATE).days + 1
+# Window an append batch advances the clock by (``--append``)
+APPEND_STEPS = {"day": pd.Timedelta(days=1), "hour": pd.Timedelta(hours=1)}
+
+# Row volumes at scale factor 1.0; larger scale factors multiply the customer count and the
+# per-customer ratios keep the other tables proportional.
+CUSTOMERS_PER_SCALE_FACTOR = 20_000
+ORDERS_PER_CUSTOMER = 1.5
+EVENTS_PER_CUSTOMER = 4.0
+PARTICIPANTS_PER_CUSTOMER = 1.5
+DEFAULT_CHUNK_CUSTOMERS = 20_000
+
+TABLES = ["customers", "products", "orders", "order_items", "events", "marketing_experiments"]
+OUTPUT_FORMATS = ["csv", "parquet"]
+# Fact tables that can be split into month=YYYY-MM directories in Parquet output
+MONTH_PARTITIONS = {"orders": "order_ts", "events": "event_ts"}
+PARQUET_COMPRESSION = "zstd"
+
+# Physical order of each table in the prebuilt database, chosen for the labs' scans and joins
+SORT_KEYS = {
+    "customers": "customer_id",
+    "products": "product_id",
+    "orders": "order_ts, order_id",
+    "order_items": "order_id, product_id",
+    "events": "customer_id, event_ts",
+    "marketing_experiments": "exposed_ts, exp_id",
+}
+# ART indexes for the labs' point lookups and joins on columns that are not the sort key's lead.
+# They are created after the sorted load, so building them does not slow every insert.
+INDEXES = {"order_items": ["order_id"], "events": ["customer_id"]}
+# Rows per Parquet row group; DuckDB's own row group size, so min/max statistics prune as finely
+PARQUET_ROW_GROUP_ROWS = 122_880
+
+# One independent random stream per generated table inside every shard
+SHARD_STREAMS = ["customers", "orders", "order_items", "events", "marketing_experiments"]
+
+# (name, base conversion rate, lift of the best arm over control, number of arms)
+EXPERIMENTS = [
+    ("landing_page_cta", 0.12, 0.04, 2),
+]
+
+# (category, lowest price, highest price); every category gets PRODUCTS_PER_CATEGORY products
+PRODUCT_CATEGORIES = [
+    ("Analytics", 49, 299),
+    ("Marketing", 29, 199),
+    ("Productivity", 19, 149),
+    ("Finance", 39, 249),
+]
+PRODUCTS_PER_CATEGORY = 10
+
+# Low-cardinality string columns: generated as pandas Categoricals (dictionary-encoded in Parquet)
+# and declared as DuckDB ENUM types of the same name in schema.sql. Keys are the type names.
+ENUMS = {
+    "country": ["CO", "US", "MX", "AR", "CL", "PE", "BR", "ES"],
+    "age_band": ["18-24", "25-34", "35-44", "45-54", "55-64", "65+"],
+    "income_band": ["<1k", "1-2k", "2-4k", "4-6k", "6-10k", "10k+"],
+    "channel": ["organic", "paid", "referral", "partner"],
+    "category": [category for category, _, _ in PRODUCT_CATEGORIES],
+    "source": ["web", "app", "partner", "sales"],
+    "event_type": ["visit", "signup", "trial_start", "purchase", "cancel"],
+    "experiment": [name for name, *_ in EXPERIMENTS],
+    "arm": list(ascii_uppercase[:max(n_arms for *_, n_arms in EXPERIMENTS)]),
+}
+
+SOURCE_WEIGHTS = [0.55, 0.25, 0.12, 0.08]
+EVENT_TYPE_WEIGHTS = [0.55, 0.1, 0.12, 0.18, 0.05]
+
+# Id columns and the table whose id space they draw from; their width is planned per run
+ID_SPACES = {
+    "customer_id": "customers",
+    "user_id": "customers",
+    "order_id": "orders",
+    "event_id": "events",
+    "exp_id": "marketing_experiments",
+}
+
+
+def random_dates(
+    rng: np.random.Generator,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    n: int,
+    profile: str = distributions.DEFAULT_PROFILE,
+) -> pd.Series:
+    """``n`` days in ``[start, end]``, weighted by the profile's seasonality."""
+    offsets = distributions.sample_days(rng, distributions.day_weights(start, end, profile), n)
+    return pd.DatetimeIndex(start.as_unit("ns").to_datetime64() + offsets.astype("timedelta64[D]"))
+
+
+def random_dates_after(
+    rng: np.random.Generator,
+    starts: np.ndarray,
+    end: pd.Timestamp,
+    profile: str = distributions.DEFAULT_PROFILE,
+) -> pd.DatetimeIndex:
+    """Vectorized ``random_dates``: one day in ``[start, end]`` per row."""
+    starts = pd.DatetimeIndex(starts).normalize()
+    if len(starts) == 0:
+        return starts
+    first = starts.min().to_datetime64()
+    weights = distributions.day_weights(starts.min(), end, profile)
+    offsets = distributions.sample_days(rng, weights, len(starts), (starts.to_numpy() - first) // np.timedelta64(1, "D"))
+    return pd.DatetimeIndex(first + offsets.astype("timedelta64[D]"))
+
+
+def random_times(rng: np.random.Generator, start: pd.Timestamp, end: pd.Timestamp, n: int) -> pd.DatetimeIndex:
+    """Uniform timestamps in ``[start, end)`` to the second, for windows shorter than a day."""
+    seconds = int((end - start).total_seconds())
+    return start + pd.to_timedelta(rng.integers(0, seconds, size=n), unit="s")
+
+
+def int_dtype(max_value: int) -> str:
+    """Narrowest signed integer dtype holding ``0..max_value`` (signed, like DuckDB's INTEGER)."""
+    for dtype in ["int8", "int16", "int32"]:
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return "int64"
+
+
+def choose_category(rng: np.random.Generator, enum: str, size: int, p: list = None) -> pd.Categorical:
+    """``rng.choice`` over ``ENUMS[enum]``, drawn as codes so no string array is ever built."""
+    return pd.Categorical.from_codes(rng.choice(len(ENUMS[enum]), size=size, p=p), categories=ENUMS[enum])
+
+
+def narrow_ids(df: pd.DataFrame, id_dtypes: dict) -> pd.DataFrame:
+    """Cast the id columns of ``df`` to the widths planned for their id spaces."""
+    if not id_dtypes:
+        return df
+    return df.astype({column: id_dtypes[ID_SPACES[column]] for column in df.columns if column in ID_SPACES})
+
+
+def generate_customers(
+    rng: np.random.Generator,
+    n_customers: int = 20000,
+    first_id: int = 1,
+    start: pd.Timestamp = START_DATE,
+    end: pd.Timestamp = END_DATE,
+    profile: str = distributions.DEFAULT_PROFILE,
+) -> pd.DataFrame:
+    """Create the core customer dimension with spec-aligned categories; signups fall in ``[start, end]``."""
+
+    signup_dates = random_dates(rng, start, end, n_customers, profile)
     df = pd.DataFrame({
-        "customer_id": np.arange(1, n_customers + 1),
+        "customer_id": np.arange(first_id, first_id + n_customers),
         "signup_date": signup_dates,
-        "country": np.random.choice(countries, size=n_customers),
-        "age_band": np.random.choice(age_bands, size=n_customers, p=[0.18, 0.32, 0.22, 0.14, 0.09, 0.05]),
-        "income_band": np.random.choice(income_bands, size=n_customers, p=[0.14, 0.2, 0.22, 0.2, 0.16, 0.08]),
-        "channel": np.random.choice(channels, size=n_customers, p=[0.48, 0.22, 0.18, 0.12]),
+        "country": choose_category(rng, "country", n_customers),
+        "age_band": choose_category(rng, "age_band", n_customers, p=[0.18, 0.32, 0.22, 0.14, 0.09, 0.05]),
+        "income_band": choose_category(rng, "income_band", n_customers, p=[0.14, 0.2, 0.22, 0.2, 0.16, 0.08]),
+        "channel": choose_category(rng, "channel", n_customers, p=[0.48, 0.22, 0.18, 0.12]),
     })
     return df
 
 
-def generate_products() -> pd.DataFrame:
-    categories = [
-        ("Analytics", 49, 299),
-        ("Marketing", 29, 199),
-        ("Productivity", 19, 149),
-        ("Finance", 39, 249),
-    ]
+def generate_products(rng: np.random.Generator) -> pd.DataFrame:
     # Realistic product name prefixes and suffixes
     prefixes = ["Pro", "Enterprise", "Cloud", "AI", "Smart", "Ultra", "Core", "Prime", "Elite", "Max"]
     suffixes = ["Hub", "Suite", "Platform", "Engine", "Manager", "Studio", "System", "Tool", "Assistant", "Dashboard"]
     product_rows = []
     product_id = 1
-    for cat, low, high in categories:
-        for i in range(10):
-            price = np.random.uniform(low, high)
+    for cat, low, high in PRODUCT_CATEGORIES:
+        for i in range(PRODUCTS_PER_CATEGORY):
+            price = rng.uniform(low, high)
             product_name = f"{prefixes[i % len(prefixes)]} {cat} {suffixes[i % len(suffixes)]}"
             product_rows.append({
                 "product_id": product_id,
@@ -70,113 +204,181 @@ def generate_products() -> pd.DataFrame:
                 "price_usd": round(price, 2),
             })
             product_id += 1
-    return pd.DataFrame(product_rows)
+    df = pd.DataFrame(product_rows)
+    return df.astype({
+        "product_id": int_dtype(len(df)),
+        "category": pd.CategoricalDtype(ENUMS["category"]),
+    })
 
 
-def generate_orders(customers: pd.DataFrame, n_orders: int = 30000) -> pd.DataFrame:
+def generate_orders(
+    rng: np.random.Generator,
+    customers: pd.DataFrame,
+    n_orders: int = 30000,
+    first_id: int = 1,
+    profile: str = distributions.DEFAULT_PROFILE,
+) -> pd.DataFrame:
     customer_ids = customers["customer_id"].values
-    # weight by recency to create more recent orders
+    # weight by recency to create more recent orders, times each customer's Zipf popularity
     signup_rank = customers["signup_date"].rank(method="first")
-    weights = 0.3 + 0.7 * (signup_rank / signup_rank.max())
-    weights = weights / weights.sum()
-
-    chosen_customers = np.random.choice(customer_ids, size=n_orders, p=weights)
-    signup_map = customers.set_index("customer_id")["signup_date"]
-    order_dates = []
-    for cid in chosen_customers:
-        start = signup_map.loc[cid]
-        order_dates.append(random_dates(start, END_DATE, 1)[0])
-    order_dates = pd.to_datetime(order_dates)
-
-    sources = ["web", "app", "partner", "sales"]
+    weights = (0.3 + 0.7 * (signup_rank / signup_rank.max())).to_numpy()
+    popularity = distributions.zipf_weights(len(customers), distributions.PROFILES[profile]["customer_zipf"])
+    weights = weights * popularity[rng.permutation(len(customers))]
+
+    # draw row positions so signup dates can be gathered by index instead of per-id lookups
+    chosen_idx = distributions.alias_sample(rng, distributions.alias_table(weights), n_orders)
+    order_dates = random_dates_after(rng, customers["signup_date"].values[chosen_idx], END_DATE, profile)
+    # number orders in time order, so order_id ranges (and order_items sorted by them) follow order_ts
+    by_time = np.argsort(order_dates, kind="stable")
+    chosen_customers, order_dates = customer_ids[chosen_idx[by_time]], order_dates[by_time]
+
     df = pd.DataFrame({
-        "order_id": np.arange(1, n_orders + 1),
+        "order_id": np.arange(first_id, first_id + n_orders),
         "customer_id": chosen_customers,
         "order_ts": order_dates,
-        "source": np.random.choice(sources, size=n_orders, p=[0.55, 0.25, 0.12, 0.08]),
+        "source": choose_category(rng, "source", n_orders, p=SOURCE_WEIGHTS),
     })
     return df
 
 
-def generate_order_items(orders: pd.DataFrame, products: pd.DataFrame) -> pd.DataFrame:
-    """Guarantee every order has at least one line item while preserving realism."""
-
-    product_ids = products["product_id"].values
-    prices = products.set_index("product_id")["price_usd"].to_dict()
+def generate_order_items(
+    rng: np.random.Generator,
+    orders: pd.DataFrame,
+    products: pd.DataFrame,
+    batch_size: int = 250_000,
+    profile: str = distributions.DEFAULT_PROFILE,
+) -> pd.DataFrame:
+    """Guarantee every order has at least one line item while preserving realism.
 
-    rows = []
-    # ensure coverage: each order gets 1-3 products, no replacement to avoid duplicates per order
-    for order_id in orders["order_id"]:
-        n_items = np.random.choice([1, 2, 3], p=[0.55, 0.3, 0.15])
-        chosen_products = np.random.choice(product_ids, size=n_items, replace=False)
-        for pid in chosen_products:
-            qty = np.random.randint(1, 5)
-            base_price = prices[pid]
-            price_noise = np.random.normal(0, 3)
-            unit_price = max(base_price + price_noise, base_price * 0.7)
-            rows.append({
-                "order_id": order_id,
-                "product_id": pid,
-                "qty": int(qty),
-                "unit_price_usd": round(unit_price, 2),
-            })
+    Orders are processed in batches: each order draws a random key per catalog product and
+    keeps the products with the smallest keys, which samples without replacement in bulk.
+    With product popularity, a key ``u`` becomes ``-log(u) / weight`` (Efraimidis-Spirakis),
+    which makes the same selection a weighted sample without replacement.
+    """
 
-    return pd.DataFrame(rows)
+    product_ids = products["product_id"].to_numpy()
+    base_prices = products["price_usd"].to_numpy(dtype=float)
+    max_items = 3
+    exponent = distributions.PROFILES[profile]["product_zipf"]
+    # cheaper products are more popular
+    popularity = distributions.zipf_weights(len(product_ids), exponent)[np.argsort(np.argsort(base_prices))]
 
+    order_ids = orders["order_id"].to_numpy()
+    # ensure coverage: each order gets 1-3 products, no replacement to avoid duplicates per order
+    n_items = rng.choice([1, 2, 3], size=len(order_ids), p=[0.55, 0.3, 0.15])
+
+    order_col, product_idx = [], []
+    for lo in range(0, len(order_ids), batch_size):
+        hi = min(lo + batch_size, len(order_ids))
+        keys = rng.random((hi - lo, len(product_ids)))
+        if exponent:
+            keys = -np.log(keys) / popularity
+        picked = np.argpartition(keys, max_items - 1, axis=1)[:, :max_items]
+        # order the picked columns by key so the first n_items columns are a uniform subset
+        picked = np.take_along_axis(
+            picked, np.argsort(np.take_along_axis(keys, picked, axis=1), axis=1), axis=1
+        )
+        keep = np.arange(max_items) < n_items[lo:hi, None]
+        order_col.append(np.repeat(order_ids[lo:hi], n_items[lo:hi]))
+        product_idx.append(picked[keep])
+
+    order_col = np.concatenate(order_col) if order_col else np.array([], dtype=order_ids.dtype)
+    product_idx = np.concatenate(product_idx) if product_idx else np.array([], dtype=int)
+
+    n_rows = len(product_idx)
+    qty = rng.integers(1, 5, size=n_rows)
+    base_price = base_prices[product_idx]
+    price_noise = rng.normal(0, 3, size=n_rows)
+    unit_price = np.maximum(base_price + price_noise, base_price * 0.7)
+
+    return pd.DataFrame({
+        "order_id": order_col,
+        "product_id": product_ids[product_idx],
+        "qty": qty.astype(np.int8),
+        "unit_price_usd": np.round(unit_price, 2),
+    })
 
-def generate_events(customers: pd.DataFrame, target_events: int = 80000) -> pd.DataFrame:
-    event_types = ["visit", "signup", "trial_start", "purchase", "cancel"]
-    probs = [0.55, 0.1, 0.12, 0.18, 0.05]
 
-    events_per_customer = np.random.poisson(4, size=len(customers))
+def draw_events_per_customer(rng: np.random.Generator, n_customers: int, target_events: int) -> np.ndarray:
+    """Event counts per customer; the first draw from the events stream, so counts can be planned ahead."""
+    events_per_customer = rng.poisson(4, size=n_customers)
     scale = target_events / events_per_customer.sum()
-    events_per_customer = np.maximum(1, (events_per_customer * scale).astype(int))
-
-    rows = []
-    for customer_id, signup_date, epc in zip(customers["customer_id"], customers["signup_date"], events_per_customer):
-        timestamps = random_dates(signup_date, END_DATE, epc)
-        timestamps = np.sort(timestamps)
-        event_types_for_customer = np.random.choice(event_types, size=epc, p=probs)
-        for ts, et in zip(timestamps, event_types_for_customer):
-            rows.append({
-                "event_id": len(rows) + 1,
-                "customer_id": customer_id,
-                "event_ts": ts,
-                "event_type": et,
-            })
-    df = pd.DataFrame(rows)
+    return np.maximum(1, (events_per_customer * scale).astype(int))
+
+
+def generate_events(
+    rng: np.random.Generator,
+    customers: pd.DataFrame,
+    target_events: int = 80000,
+    first_id: int = 1,
+    profile: str = distributions.DEFAULT_PROFILE,
+) -> pd.DataFrame:
+    events_per_customer = draw_events_per_customer(rng, len(customers), target_events)
+
+    # one row per event: repeat each customer's attributes, then draw offsets inside its window
+    customer_ids = np.repeat(customers["customer_id"].to_numpy(), events_per_customer)
+    timestamps = random_dates_after(
+        rng, np.repeat(customers["signup_date"].to_numpy(), events_per_customer), END_DATE, profile
+    )
+    types = rng.choice(len(ENUMS["event_type"]), size=len(customer_ids), p=EVENT_TYPE_WEIGHTS)
+
+    order = np.lexsort((timestamps.asi8, customer_ids))
+    df = pd.DataFrame({
+        "event_id": np.arange(first_id, first_id + len(customer_ids)),
+        "customer_id": customer_ids[order],
+        "event_ts": timestamps[order],
+        "event_type": pd.Categorical.from_codes(types[order], categories=ENUMS["event_type"]),
+    })
     return df
 
 
-def generate_marketing_experiments(customers: pd.DataFrame, n_participants: int = 30000) -> pd.DataFrame:
+def generate_marketing_experiments(
+    rng: np.random.Generator,
+    customers: pd.DataFrame,
+    n_participants: int = 30000,
+    experiments: list = EXPERIMENTS,
+    first_id: int = 1,
+    window: tuple = None,
+) -> pd.DataFrame:
+    """Assign customers to concurrent experiments and simulate conversions.
+
+    ``experiments`` holds ``(name, base_rate, lift, n_arms)`` tuples. Arm ``A`` converts at
+    ``base_rate`` and the last arm at ``base_rate + lift``, with intermediate arms evenly spaced.
+    Each experiment draws its own participants, so a customer can be exposed to several.
+    Exposures fall on random days after the first month of history, or inside ``window``
+    (a ``(start, end)`` pair) for an append batch.
+    """
     # Cap participant draw to the available customer pool to avoid oversampling errors
     participant_count = min(n_participants, len(customers))
-    chosen_customers = np.random.choice(
-        customers["customer_id"].values, size=participant_count, replace=False
-    )
-    groups = np.random.choice(["A", "B"], size=participant_count)
-    exposures = random_dates(
-        START_DATE + pd.DateOffset(months=1), END_DATE, participant_count
-    )
+    customer_ids = customers["customer_id"].values
+    chosen_customers = np.concatenate([
+        rng.choice(customer_ids, size=participant_count, replace=False) for _ in experiments
+    ])
+
+    names, base_rates, lifts, n_arms = (np.array(col) for col in zip(*experiments))
+    exp_idx = np.repeat(np.arange(len(experiments)), participant_count)
+    n_rows = len(exp_idx)
+
+    arms = rng.integers(0, n_arms[exp_idx])
+    if window:
+        exposures = random_times(rng, *window, n_rows)
+    else:
+        exposures = random_dates(
+            rng, START_DATE + pd.DateOffset(months=1), END_DATE, n_rows
+        )
 
-    base_rate = 0.12
-    lift = 0.04
-    conversions = []
-    conversion_ts = []
-    for grp, exp_ts in zip(groups, exposures):
-        prob = base_rate + (lift if grp == "B" else 0)
-        converted = np.random.rand() < prob
-        conversions.append(converted)
-        if converted:
-            delay_days = np.random.randint(1, 30)
-            conversion_ts.append(exp_ts + timedelta(days=int(delay_days)))
-        else:
-            conversion_ts.append(pd.NaT)
+    # per-row conversion probability from the experiment's base rate and the arm's share of the lift
+    arm_share = arms / np.maximum(n_arms[exp_idx] - 1, 1)
+    prob = base_rates[exp_idx] + lifts[exp_idx] * arm_share
+    conversions = rng.random(n_rows) < prob
+    delay_days = rng.integers(1, 30, size=n_rows)
+    conversion_ts = exposures.where(conversions) + pd.to_timedelta(delay_days, unit="D")
 
     df = pd.DataFrame({
-        "exp_id": np.arange(1, participant_count + 1),
+        "exp_id": np.arange(first_id, first_id + n_rows),
+        "experiment": pd.Categorical.from_codes(exp_idx, categories=names),
         "user_id": chosen_customers,
-        "group": groups,
+        "group": pd.Categorical.from_codes(arms, categories=list(ascii_uppercase[:n_arms.max()])),
         "exposed_ts": exposures,
         "converted": conversions,
         "conversion_ts": conversion_ts,
@@ -191,21 +393,25 @@ def compute_order_revenue(orders: pd.DataFrame, order_items: pd.DataFrame) -> pd
     return orders
 
 
-def write_schema_and_seed(sample_dir: Path):
-    schema = """
+def write_schema_and_seed(sample_dir: Path, fmt: str = "csv"):
+    types = "\n".join(
+        f"CREATE TYPE {name} AS ENUM ({', '.join(repr(value) for value in values)});" for name, values in ENUMS.items()
+    )
+    schema = types + """
+
 CREATE TABLE customers (
     customer_id INTEGER PRIMARY KEY,
     signup_date DATE,
-    country VARCHAR,
-    age_band VARCHAR,
-    income_band VARCHAR,
-    channel VARCHAR
+    country country,
+    age_band age_band,
+    income_band income_band,
+    channel channel
 );
 
 CREATE TABLE products (
     product_id INTEGER PRIMARY KEY,
     product_name VARCHAR,
-    category VARCHAR,
+    category category,
     price_usd DECIMAL(10,2)
 );
 
@@ -213,14 +419,14 @@ CREATE TABLE orders (
     order_id INTEGER PRIMARY KEY,
     customer_id INTEGER,
     order_ts TIMESTAMP,
-    source VARCHAR,
+    source source,
     revenue_usd DECIMAL(10,2)
 );
 
 CREATE TABLE order_items (
     order_id INTEGER,
     product_id INTEGER,
-    qty INTEGER,
+    qty TINYINT,
     unit_price_usd DECIMAL(10,2)
 );
 
@@ -228,13 +434,14 @@ CREATE TABLE events (
     event_id INTEGER PRIMARY KEY,
     customer_id INTEGER,
     event_ts TIMESTAMP,
-    event_type VARCHAR
+    event_type event_type
 );
 
 CREATE TABLE marketing_experiments (
     exp_id INTEGER PRIMARY KEY,
+    experiment experiment,
     user_id INTEGER,
-    "group" VARCHAR,
+    "group" arm,
     exposed_ts TIMESTAMP,
     converted BOOLEAN,
     conversion_ts TIMESTAMP
@@ -243,85 +450,484 @@ CREATE TABLE marketing_experiments (
     # Use relative path from project root for portability
     relative_sample_dir = sample_dir.relative_to(BASE_DIR)
     seed_lines = []
-    for table in ["customers", "products", "orders", "order_items", "events", "marketing_experiments"]:
-        seed_lines.append(
-            f"COPY {table} FROM '{relative_sample_dir / (table + '.csv')}' WITH (HEADER, DELIMITER ',');"
-        )
-    (SQL_DIR / "schema.sql").write_text(schema.strip() + "\n")
+    for table in TABLES:
+        if fmt == "parquet":
+            # typed columns, no CSV parsing; BY NAME lets DuckDB read only the columns the table declares
+            seed_lines.append(
+                f"INSERT INTO {table} BY NAME SELECT * FROM read_parquet('{relative_sample_dir / (table + '.parquet')}');"
+            )
+        else:
+            seed_lines.append(
+                f"COPY {table} FROM '{relative_sample_dir / (table + '.csv')}' WITH (HEADER, DELIMITER ',');"
+            )
+    indexes = "".join(
+        f"\nCREATE INDEX {table}_{column}_idx ON {table} ({column});"
+        for table, columns in INDEXES.items()
+        for column in columns
+    )
+    (SQL_DIR / "schema.sql").write_text(schema.strip() + "\n" + indexes + "\n")
     (SQL_DIR / "seed.sql").write_text("\n".join(seed_lines) + "\n")
 
 
-def save_samples_with_integrity(datasets: dict, sample_customers: int = 500):
+def build_database(sample_dir: Path, db_path: Path = DATABASE_PATH, fmt: str = "csv"):
+    """Build the DuckDB file the labs open read-only.
+
+    Tables are created from ``schema.sql`` and loaded in ``SORT_KEYS`` order, so zone maps on the
+    sort columns are tight; the schema's ``INDEXES`` are built once the rows are in. The revenue
+    rollups and the cohort cube are built from the loaded tables, then statistics are refreshed
+    and the file is checkpointed once.
+    """
+    tmp_path = db_path.with_suffix(".duckdb.tmp")
+    tmp_path.unlink(missing_ok=True)
+    con = duckdb.connect(str(tmp_path))
+    statements = [statement for statement in (SQL_DIR / "schema.sql").read_text().split(";") if statement.strip()]
+    indexes = [statement for statement in statements if re.match(r"\s*CREATE INDEX", statement, flags=re.IGNORECASE)]
+    for statement in statements:
+        if statement not in indexes:
+            con.execute(statement)
+    for table in TABLES:
+        source = sample_dir / f"{table}.{fmt}"
+        reader = f"read_parquet('{source}')" if fmt == "parquet" else f"read_csv('{source}', header = true)"
+        con.execute(f"INSERT INTO {table} BY NAME SELECT * FROM {reader} ORDER BY {SORT_KEYS[table]}")
+    for statement in indexes:
+        con.execute(statement)
+    rollups.build_rollups(con)
+    cohorts.build_cohort_cube(con)
+    con.execute("ANALYZE")
+    con.execute("CHECKPOINT")
+    con.close()
+    # swap in the finished file so readers never see a half-built database
+    tmp_path.replace(db_path)
+
+
+def write_table(df: pd.DataFrame, path: Path, fmt: str = "csv"):
+    """Write ``df`` to ``path`` plus the format's suffix."""
+    if fmt == "parquet":
+        df.to_parquet(
+            path.with_suffix(".parquet"), index=False, compression=PARQUET_COMPRESSION,
+            row_group_size=PARQUET_ROW_GROUP_ROWS,
+        )
+    else:
+        df.to_csv(path.with_suffix(".csv"), index=False)
+
+
+def clear_partitions(out_dir: Path):
+    """Remove part files left by a previous run so a smaller dataset does not inherit stale shards."""
+    for name in TABLES:
+        for part in (out_dir / name).glob("**/part-*.*"):
+            part.unlink()
+
+
+def write_partition(
+    datasets: dict,
+    out_dir: Path,
+    shard_index: int,
+    fmt: str = "csv",
+    partition_by_month: bool = False,
+):
+    """Write one shard of every table as ``<out_dir>/<table>/part-<shard>.<fmt>``.
+
+    Shards come out of the generator in ``SORT_KEYS`` order (orders and their items by time,
+    events by customer), so the min/max statistics of each Parquet row group are narrow.
+
+    With ``partition_by_month`` the Parquet files of ``orders`` and ``events`` go under
+    hive-style ``month=YYYY-MM`` directories so time filters can skip whole months.
+    """
+    for name, df in datasets.items():
+        table_dir = out_dir / name
+        table_dir.mkdir(parents=True, exist_ok=True)
+        if fmt == "parquet" and partition_by_month and name in MONTH_PARTITIONS:
+            table = pa.Table.from_pandas(
+                df.assign(month=df[MONTH_PARTITIONS[name]].dt.strftime("%Y-%m")), preserve_index=False
+            )
+            pq.write_to_dataset(
+                table,
+                table_dir,
+                partition_cols=["month"],
+                basename_template=f"part-{shard_index:05d}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                compression=PARQUET_COMPRESSION,
+                min_rows_per_group=PARQUET_ROW_GROUP_ROWS,
+                max_rows_per_group=PARQUET_ROW_GROUP_ROWS,
+            )
+        else:
+            write_table(df, table_dir / f"part-{shard_index:05d}", fmt)
+
+
+def synthetic_reader(source_dir: Path, table: str, fmt: str = "csv") -> str:
+    """DuckDB scan over every part file of ``table``, month partitions included.
+
+    Files are unified by column name, since append batches may write wider ids than the shards.
+    """
+    parts = source_dir / table / f"**/part-*.{fmt}"
+    if fmt == "parquet":
+        # the month=YYYY-MM directories only split files; the column already exists in the data
+        return f"read_parquet('{parts}', hive_partitioning = false, union_by_name = true)"
+    return f"read_csv('{parts}', header = true, union_by_name = true)"
+
+
+def save_samples_with_integrity(
+    source_dir: Path = SYNTHETIC_DIR,
+    sample_customers: int = 500,
+    fmt: str = "csv",
+    sample_modulus: int = None,
+    sample_dir: Path = SAMPLES_DIR,
+):
     """
     Save samples maintaining referential integrity.
     Sample customers first, then filter related tables to match.
+
+    The cascade runs in DuckDB over the part files in ``source_dir``, so nothing is loaded
+    into pandas: customers are picked by ``hash(customer_id)`` and every other table is
+    streamed through a hash semi-join on the sampled ids. Only the sampled customer and
+    order ids are held in memory.
+
+    The sample is deterministic and independent of sharding: with ``sample_modulus`` every
+    customer whose hash is divisible by it is a candidate (about 1 in ``sample_modulus``),
+    and the ``sample_customers`` candidates with the smallest hashes are kept (all of them
+    when ``sample_customers`` is None).
     """
-    # Save full synthetic data
-    for name, df in datasets.items():
-        df.to_csv(SYNTHETIC_DIR / f"{name}.csv", index=False)
+    con = duckdb.connect()
+    reader = partial(synthetic_reader, source_dir, fmt=fmt)
+    candidates = f"WHERE hash(customer_id) % {sample_modulus} = 0" if sample_modulus else ""
+    limit = f"LIMIT {sample_customers}" if sample_customers is not None else ""
 
     # Sample customers first
-    customers = datasets["customers"]
-    sampled_customers = customers.sample(n=min(sample_customers, len(customers)), random_state=42)
-    customer_ids = set(sampled_customers["customer_id"].values)
+    con.execute(f"""
+        CREATE TEMP TABLE sampled_customers AS
+        SELECT customer_id FROM {reader("customers")} {candidates}
+        ORDER BY hash(customer_id), customer_id {limit}
+    """)
 
     # Filter orders to only include sampled customers
-    orders = datasets["orders"]
-    sampled_orders = orders[orders["customer_id"].isin(customer_ids)]
-    order_ids = set(sampled_orders["order_id"].values)
-
-    # Filter order_items to only include sampled orders
-    order_items = datasets["order_items"]
-    sampled_order_items = order_items[order_items["order_id"].isin(order_ids)]
-
-    # Get product_ids from sampled order_items
-    product_ids = set(sampled_order_items["product_id"].values)
-
-    # Products - keep all products (they're the dimension table)
-    products = datasets["products"]
-
-    # Filter events to only include sampled customers
-    events = datasets["events"]
-    sampled_events = events[events["customer_id"].isin(customer_ids)]
-
-    # Filter marketing_experiments to only include sampled customers (user_id column)
-    marketing = datasets["marketing_experiments"]
-    sampled_marketing = marketing[marketing["user_id"].isin(customer_ids)]
-
-    # Save sampled data
-    sampled_customers.to_csv(SAMPLES_DIR / "customers.csv", index=False)
-    products.to_csv(SAMPLES_DIR / "products.csv", index=False)
-    sampled_orders.to_csv(SAMPLES_DIR / "orders.csv", index=False)
-    sampled_order_items.to_csv(SAMPLES_DIR / "order_items.csv", index=False)
-    sampled_events.to_csv(SAMPLES_DIR / "events.csv", index=False)
-    sampled_marketing.to_csv(SAMPLES_DIR / "marketing_experiments.csv", index=False)
-
-
-def main():
-    customers = generate_customers()
-    products = generate_products()
-    orders = generate_orders(customers)
-    order_items = generate_order_items(orders, products)
+    con.execute(f"""
+        CREATE TEMP TABLE sampled_orders AS
+        SELECT order_id FROM {reader("orders")}
+        WHERE customer_id IN (SELECT customer_id FROM sampled_customers)
+    """)
+
+    # (table, semi-join filter), written in SORT_KEYS order; products are the dimension table, kept whole
+    in_customers = "IN (SELECT customer_id FROM sampled_customers)"
+    cascade = [
+        ("customers", f"customer_id {in_customers}"),
+        ("products", "true"),
+        ("orders", f"customer_id {in_customers}"),
+        ("order_items", "order_id IN (SELECT order_id FROM sampled_orders)"),
+        ("events", f"customer_id {in_customers}"),
+        ("marketing_experiments", f"user_id {in_customers}"),
+    ]
+    sample_dir.mkdir(parents=True, exist_ok=True)
+    options = f"FORMAT parquet, COMPRESSION {PARQUET_COMPRESSION}" if fmt == "parquet" else "HEADER"
+    for table, semi_join in cascade:
+        con.execute(f"""
+            COPY (SELECT * FROM {reader(table)} WHERE {semi_join} ORDER BY {SORT_KEYS[table]})
+            TO '{sample_dir / f"{table}.{fmt}"}' ({options})
+        """)
+    con.close()
+
+
+def shard_rngs(seed: int, shard_index: int) -> dict:
+    """Independent generator per table for one shard, derived from ``(seed, shard_index)`` only."""
+    children = np.random.SeedSequence(seed, spawn_key=(shard_index,)).spawn(len(SHARD_STREAMS))
+    return {name: np.random.default_rng(child) for name, child in zip(SHARD_STREAMS, children)}
+
+
+def plan_shards(n_customers: int, chunk_size: int, seed: int) -> list:
+    """Split the customer id space into shards and fix each shard's first id per table up front.
+
+    Every count is either a fixed ratio of the shard's customers or, for events, a cheap replay of
+    the first draw of the shard's events stream, so ids do not depend on which worker runs what.
+    The largest id of every table is known once all shards are planned, so each shard also gets
+    the same narrow id dtypes and every part file shares one schema.
+    """
+    next_ids = {"customers": 1, "orders": 1, "events": 1, "marketing_experiments": 1}
+    shards = []
+    for shard_index, first_customer in enumerate(range(0, n_customers, chunk_size)):
+        shard_customers = min(chunk_size, n_customers - first_customer)
+        events_per_customer = draw_events_per_customer(
+            shard_rngs(seed, shard_index)["events"], shard_customers, round(shard_customers * EVENTS_PER_CUSTOMER)
+        )
+        participants = min(round(shard_customers * PARTICIPANTS_PER_CUSTOMER), shard_customers)
+        counts = {
+            "customers": shard_customers,
+            "orders": round(shard_customers * ORDERS_PER_CUSTOMER),
+            "events": int(events_per_customer.sum()),
+            "marketing_experiments": participants * len(EXPERIMENTS),
+        }
+        shards.append({"shard_index": shard_index, "n_customers": shard_customers, "first_ids": dict(next_ids)})
+        for name, count in counts.items():
+            next_ids[name] += count
+    id_dtypes = {name: int_dtype(next_id - 1) for name, next_id in next_ids.items()}
+    for shard in shards:
+        shard["id_dtypes"] = id_dtypes
+    return shards
+
+
+def generate_chunk(
+    rngs: dict,
+    n_customers: int,
+    products: pd.DataFrame,
+    first_ids: dict,
+    id_dtypes: dict = None,
+    profile: str = distributions.DEFAULT_PROFILE,
+) -> dict:
+    """Generate every table for one block of customers; ``first_ids`` holds the next free id per table.
+
+    ``id_dtypes`` (from ``plan_shards``) narrows the id columns; without it they stay int64.
+    ``profile`` names the ``distributions`` profile for popularity skew and seasonality.
+    """
+    customers = narrow_ids(generate_customers(
+        rngs["customers"], n_customers, first_id=first_ids["customers"], profile=profile
+    ), id_dtypes)
+    orders = narrow_ids(generate_orders(
+        rngs["orders"], customers, round(n_customers * ORDERS_PER_CUSTOMER), first_id=first_ids["orders"], profile=profile
+    ), id_dtypes)
+    order_items = generate_order_items(rngs["order_items"], orders, products, profile=profile)
+    orders = compute_order_revenue(orders, order_items)
+    events = narrow_ids(generate_events(
+        rngs["events"], customers, round(n_customers * EVENTS_PER_CUSTOMER), first_id=first_ids["events"], profile=profile
+    ), id_dtypes)
+    marketing = narrow_ids(generate_marketing_experiments(
+        rngs["marketing_experiments"], customers, round(n_customers * PARTICIPANTS_PER_CUSTOMER),
+        first_id=first_ids["marketing_experiments"],
+    ), id_dtypes)
+    return {
+        "customers": customers,
+        "orders": orders,
+        "order_items": order_items,
+        "events": events,
+        "marketing_experiments": marketing,
+    }
+
+
+def generate_shard(
+    shard: dict,
+    products: pd.DataFrame,
+    seed: int,
+    fmt: str = "csv",
+    partition_by_month: bool = False,
+    profile: str = distributions.DEFAULT_PROFILE,
+) -> dict:
+    """Generate and write one shard; runs in a worker process when ``--workers`` > 1."""
+    rngs = shard_rngs(seed, shard["shard_index"])
+    chunk = generate_chunk(rngs, shard["n_customers"], products, shard["first_ids"], shard["id_dtypes"], profile)
+    write_partition(chunk, SYNTHETIC_DIR, shard["shard_index"], fmt, partition_by_month)
+    return {name: len(df) for name, df in chunk.items()}
+
+
+def generate_window(
+    rngs: dict,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    next_ids: dict,
+    daily_signups: float,
+    products: pd.DataFrame,
+    profile: str = distributions.DEFAULT_PROFILE,
+) -> dict:
+    """Generate only the rows that happen in ``[start, end)`` on top of an existing dataset.
+
+    New customers sign up at ``daily_signups`` per day. Orders and events come from every
+    customer so far (ids ``1..`` the last one, uniformly) at the snapshot's per-customer ratios
+    spread over its history, and new customers are exposed to every experiment, as in the
+    snapshot. ``next_ids`` holds the next free id per table, so ids continue where the last
+    shard or batch stopped. The profile's seasonality scales every volume by the window's day
+    and its product popularity applies to the items; customer popularity does not carry over.
+    """
+    # window length in days, scaled by how busy the profile makes this day against the average one
+    days = (end - start) / pd.Timedelta(days=1)
+    days *= distributions.volume_factor(start, START_DATE, END_DATE, profile)
+    n_new = rngs["customers"].poisson(daily_signups * days)
+    customers = generate_customers(
+        rngs["customers"], n_new, first_id=next_ids["customers"], start=start.normalize(), end=start.normalize()
+    )
+    # every customer so far, including the ones signing up now (whose signup day is the window's)
+    n_customers = next_ids["customers"] - 1 + n_new
+
+    rng = rngs["orders"]
+    n_orders = rng.poisson(n_customers * ORDERS_PER_CUSTOMER / HISTORY_DAYS * days)
+    orders = pd.DataFrame({
+        "order_id": np.arange(next_ids["orders"], next_ids["orders"] + n_orders),
+        "customer_id": rng.integers(1, n_customers + 1, size=n_orders),
+        "order_ts": random_times(rng, start, end, n_orders).sort_values(),
+        "source": choose_category(rng, "source", n_orders, p=SOURCE_WEIGHTS),
+    })
+    order_items = generate_order_items(rngs["order_items"], orders, products, profile=profile)
     orders = compute_order_revenue(orders, order_items)
-    events = generate_events(customers)
-    marketing = generate_marketing_experiments(customers)
 
-    datasets = {
+    rng = rngs["events"]
+    n_events = rng.poisson(n_customers * EVENTS_PER_CUSTOMER / HISTORY_DAYS * days)
+    customer_ids = rng.integers(1, n_customers + 1, size=n_events)
+    timestamps = random_times(rng, start, end, n_events)
+    types = rng.choice(len(ENUMS["event_type"]), size=n_events, p=EVENT_TYPE_WEIGHTS)
+    order = np.lexsort((timestamps.asi8, customer_ids))
+    events = pd.DataFrame({
+        "event_id": np.arange(next_ids["events"], next_ids["events"] + n_events),
+        "customer_id": customer_ids[order],
+        "event_ts": timestamps[order],
+        "event_type": pd.Categorical.from_codes(types[order], categories=ENUMS["event_type"]),
+    })
+
+    marketing = generate_marketing_experiments(
+        rngs["marketing_experiments"], customers, round(n_new * PARTICIPANTS_PER_CUSTOMER),
+        first_id=next_ids["marketing_experiments"], window=(start, end),
+    )
+    return {
         "customers": customers,
-        "products": products,
         "orders": orders,
         "order_items": order_items,
         "events": events,
         "marketing_experiments": marketing,
     }
 
-    save_samples_with_integrity(datasets)
 
-    write_schema_and_seed(SAMPLES_DIR)
+def append_batches(step: str, batches: int = 1) -> list:
+    """Advance the clock of the last generated dataset by ``batches`` windows of ``step``.
 
+    Each window is written as new part files (and month partitions) next to the existing ones,
+    with ids continuing from the manifest's state, which is updated after every batch. The
+    samples and the warehouse are not rebuilt. Returns the row counts of each batch.
+    """
+    manifest = build_manifest.load(MANIFEST_PATH)
+    if "state" not in manifest:
+        raise SystemExit("No generated dataset to append to; run the generator without --append first.")
+    params, state = manifest["params"], manifest["state"]
+    products = generate_products(np.random.default_rng(np.random.SeedSequence(params["seed"])))
+    counts = []
+    for _ in range(batches):
+        start = pd.Timestamp(state["clock"])
+        end = start + APPEND_STEPS[step]
+        # the batch's streams and part files are numbered after the snapshot's shards
+        rngs = shard_rngs(params["seed"], state["next_part"])
+        batch = generate_window(
+            rngs, start, end, state["next_ids"], state["daily_signups"], products,
+            params.get("profile", distributions.DEFAULT_PROFILE),
+        )
+        state["next_ids"] = {name: state["next_ids"][name] + len(batch[name]) for name in state["next_ids"]}
+        id_dtypes = {name: int_dtype(next_id - 1) for name, next_id in state["next_ids"].items()}
+        batch = {name: narrow_ids(df, id_dtypes) for name, df in batch.items()}
+        # a quiet hour can be empty; skip those tables rather than write header-only files
+        written = {name: df for name, df in batch.items() if len(df)}
+        write_partition(written, SYNTHETIC_DIR, state["next_part"], params["format"], params["partition_by_month"])
+        state["next_part"] += 1
+        state["clock"] = end.isoformat()
+        build_manifest.save(MANIFEST_PATH, manifest)
+        counts.append({"start": start, "end": end, **{name: len(df) for name, df in batch.items()}})
+    return counts
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate the synthetic product-analytics dataset.")
+    parser.add_argument(
+        "--scale-factor", type=float, default=1.0,
+        help=f"dataset size multiplier; 1.0 = {CUSTOMERS_PER_SCALE_FACTOR:,} customers (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_CUSTOMERS,
+        help="customers generated and written per shard; bounds peak memory (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="processes generating shards in parallel; output does not depend on it (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--format", choices=OUTPUT_FORMATS, default="csv",
+        help="file format for synthetic data, samples and seed.sql (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--partition-by-month", action="store_true",
+        help="split Parquet orders and events into month=YYYY-MM directories",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="regenerate even if the generator code and parameters match the last run",
+    )
+    parser.add_argument(
+        "--profile", choices=distributions.PROFILES, default=distributions.DEFAULT_PROFILE,
+        help="popularity skew and seasonality of the data, see distributions.py (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--append", choices=APPEND_STEPS,
+        help="instead of a full rebuild, add the rows of the next day or hour to data/synthetic",
+    )
+    parser.add_argument("--batches", type=int, default=1, help="windows to append with --append (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42, help="base random seed (default: %(default)s)")
+    parser.add_argument(
+        "--sample-customers", type=int, default=500,
+        help="customers kept in data/samples (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--sample-modulus", type=int,
+        help="only sample customers with hash(customer_id) %% N = 0, about 1 in N (default: all)",
+    )
+    return parser.parse_args(argv)
+
+
+def generator_params(args: argparse.Namespace) -> dict:
+    """Every parameter that changes the generated data (the worker count does not)."""
+    return {k: v for k, v in vars(args).items() if k not in ("workers", "force", "append", "batches")}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.append:
+        for batch in append_batches(args.append, args.batches):
+            print(f"{batch['start']} .. {batch['end']}: " + ", ".join(f"{batch[name]:,} {name}" for name in SHARD_STREAMS))
+        return
+
+    # identity of this run's output: generator code plus the parameters that shape the data
+    fingerprint = build_manifest.fingerprint(
+        build_manifest.source_hash(Path(__file__).resolve()), generator_params(args)
+    )
+    outputs = [DATABASE_PATH, SQL_DIR / "seed.sql", SAMPLES_DIR / f"customers.{args.format}"]
+    if (
+        not args.force
+        and build_manifest.load(MANIFEST_PATH).get("fingerprint") == fingerprint
+        and all(path.exists() for path in outputs)
+    ):
+        print("Generator code and parameters unchanged; keeping existing data (use --force to rebuild).")
+        return
+
+    n_customers = max(1, round(args.scale_factor * CUSTOMERS_PER_SCALE_FACTOR))
+
+    clear_partitions(SYNTHETIC_DIR)
+    products = generate_products(np.random.default_rng(np.random.SeedSequence(args.seed)))
+    write_partition({"products": products}, SYNTHETIC_DIR, 0, args.format)
+
+    # each shard owns a fixed customer id range and random streams, so the worker count never changes output
+    shards = plan_shards(n_customers, args.chunk_size, args.seed)
+    run_shard = partial(
+        generate_shard,
+        products=products,
+        seed=args.seed,
+        fmt=args.format,
+        partition_by_month=args.partition_by_month,
+        profile=args.profile,
+    )
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            shard_counts = list(pool.map(run_shard, shards))
+    else:
+        shard_counts = [run_shard(shard) for shard in shards]
+
+    # sampled across all shards once they are on disk, so the sample does not depend on --chunk-size
+    save_samples_with_integrity(SYNTHETIC_DIR, args.sample_customers, args.format, args.sample_modulus)
+    write_schema_and_seed(SAMPLES_DIR, args.format)
+    build_database(SAMPLES_DIR, DATABASE_PATH, args.format)
+
+    row_counts = {name: sum(counts[name] for counts in shard_counts) for name in shard_counts[0]}
+    # where --append continues: the day after the snapshot, the next free ids and part number
+    state = {
+        "clock": (END_DATE + pd.Timedelta(days=1)).isoformat(),
+        "next_ids": {name: row_counts[name] + 1 for name in ["customers", "orders", "events", "marketing_experiments"]},
+        "next_part": len(shards),
+        "daily_signups": n_customers / HISTORY_DAYS,
+    }
+    build_manifest.save(MANIFEST_PATH, {"fingerprint": fingerprint, "params": generator_params(args), "state": state})
+
+    row_counts["products"] = len(products)
     print("Row count summary:")
-    for name, df in datasets.items():
-        print(f"- {name}: {len(df):,} rows")
+    for name in TABLES:
+        print(f"- {name}: {row_counts[name]:,} rows")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,206 @@
+"""Per-query profiling for the labs.
+
+``warehouse.query`` sends every statement through ``run_profiled``, which times it, counts the
+rows it returns and reads DuckDB's JSON profile for the rows each table scan read. Bytes scanned
+are estimated from those rows and the width of the scanned columns (strings count as their
+16-byte headers), which is enough to rank queries. Cache hits are recorded too, with no scan.
+
+``LAB_PROFILE`` controls it: ``0`` switches profiling off, ``1`` (the default) keeps the summary
+per query and ``plan`` also keeps DuckDB's operator tree, the same timings and cardinalities
+``EXPLAIN ANALYZE`` prints. ``show_report`` at the end of a lab writes ``<lab>.profile.json`` to
+``LAB_PROFILE_DIR`` and displays the queries, slowest first, so they land in the HTML report.
+"""
+import hashlib
+import html
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+
+import query_cache
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_PROFILE_DIR = PROJECT_ROOT / ".cache" / "profiles"
+LEVEL_ENV = "LAB_PROFILE"
+DIR_ENV = "LAB_PROFILE_DIR"
+
+# Bytes per value as stored in DuckDB vectors; VARCHAR is the string header
+TYPE_WIDTHS = {
+    "BOOLEAN": 1, "TINYINT": 1, "SMALLINT": 2, "INTEGER": 4, "DATE": 4, "FLOAT": 4,
+    "BIGINT": 8, "DOUBLE": 8, "TIMESTAMP": 8, "HUGEINT": 16, "VARCHAR": 16,
+}
+
+_records = []
+_column_widths = {}
+
+
+def level() -> str:
+    return os.environ.get(LEVEL_ENV, "1")
+
+
+def query_hash(sql: str) -> str:
+    return hashlib.sha256(query_cache.normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+def type_width(data_type: str) -> int:
+    if data_type.startswith("DECIMAL"):
+        precision = int(re.search(r"\d+", data_type).group())
+        return 2 if precision <= 4 else 4 if precision <= 9 else 8 if precision <= 18 else 16
+    if data_type.startswith("ENUM"):
+        return 1
+    return TYPE_WIDTHS.get(data_type, 8)
+
+
+def column_widths(con: duckdb.DuckDBPyConnection, table: str) -> dict:
+    if table not in _column_widths:
+        rows = con.execute(
+            "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = ?", [table]
+        ).fetchall()
+        _column_widths[table] = {column: type_width(data_type) for column, data_type in rows}
+    return _column_widths[table]
+
+
+def scan_stats(profile: dict, con: duckdb.DuckDBPyConnection) -> tuple:
+    """Rows read by table scans in a JSON profile and the estimated bytes behind them."""
+    rows_scanned, bytes_scanned, pending = 0, 0, [profile]
+    while pending:
+        node = pending.pop()
+        pending += node.get("children", [])
+        if node.get("operator_type") != "TABLE_SCAN":
+            continue
+        info = node.get("extra_info", {})
+        widths = column_widths(con, info.get("Text", ""))
+        filters = set(re.findall(r"\w+", str(info.get("Filters", ""))))
+        columns = set(info.get("Projections", [])) | (filters & set(widths))
+        rows = node.get("operator_rows_scanned", 0)
+        rows_scanned += rows
+        bytes_scanned += rows * sum(widths.get(column, 8) for column in columns)
+    return rows_scanned, bytes_scanned
+
+
+def record(sql: str, wall_s: float, rows: int, cached: bool = False, rows_scanned: int = 0,
+           bytes_scanned: int = 0, plan: dict = None):
+    entry = {
+        "query_hash": query_hash(sql),
+        "sql": query_cache.normalize_sql(sql),
+        "wall_s": round(wall_s, 6),
+        "rows": rows,
+        "rows_scanned": rows_scanned,
+        "bytes_scanned": bytes_scanned,
+        "cached": cached,
+    }
+    if plan is not None:
+        entry["plan"] = plan
+    _records.append(entry)
+
+
+def run_profiled(con: duckdb.DuckDBPyConnection, sql: str, arrow: bool = False):
+    """Execute ``sql`` on ``con`` and return a DataFrame (or Arrow table), recording its profile."""
+
+    def fetch(relation):
+        return relation.fetch_arrow_table() if arrow else relation.fetchdf()
+
+    if level() == "0":
+        return fetch(con.execute(sql))
+    output = Path(tempfile.gettempdir()) / f"lab_profile_{os.getpid()}.json"
+    con.execute("PRAGMA enable_profiling = 'json'")
+    con.execute(f"PRAGMA profiling_output = '{output}'")
+    try:
+        start = time.perf_counter()
+        result = fetch(con.execute(sql))
+        wall_s = time.perf_counter() - start
+        profile = json.loads(output.read_text()) if output.exists() else {}
+    finally:
+        # the connection is shared by the whole lab, so a failed query must not leave profiling on
+        con.execute("PRAGMA disable_profiling")
+        output.unlink(missing_ok=True)
+    rows_scanned, bytes_scanned = scan_stats(profile, con)
+    record(sql, wall_s, len(result), rows_scanned=rows_scanned, bytes_scanned=bytes_scanned,
+           plan=profile if level() == "plan" else None)
+    return result
+
+
+def records() -> list:
+    return list(_records)
+
+
+def report(name: str) -> dict:
+    """This process's queries, slowest first, with each one's share of the total time."""
+    total = sum(entry["wall_s"] for entry in _records)
+    queries = sorted(_records, key=lambda entry: entry["wall_s"], reverse=True)
+    return {
+        "lab": name,
+        "queries_run": len(queries),
+        "cache_hits": sum(entry["cached"] for entry in queries),
+        "total_wall_s": round(total, 6),
+        "queries": [{**entry, "share": round(entry["wall_s"] / total, 4) if total else 0.0} for entry in queries],
+    }
+
+
+def save_report(name: str, directory: Path = None) -> Path:
+    directory = Path(directory or os.environ.get(DIR_ENV) or DEFAULT_PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.profile.json"
+    path.write_text(json.dumps(report(name), indent=2) + "\n")
+    return path
+
+
+def plan_lines(node: dict, depth: int = 0) -> list:
+    """Operator tree of a JSON profile as indented text, like ``EXPLAIN ANALYZE``."""
+    lines = []
+    if "operator_type" in node:
+        parts = [
+            node["operator_type"],
+            node.get("extra_info", {}).get("Text", ""),
+            f"rows={node.get('operator_cardinality', 0):,}",
+            f"time={node.get('operator_timing', 0):.4f}s",
+        ]
+        lines.append("  " * depth + " ".join(part for part in parts if part))
+        depth += 1
+    for child in node.get("children", []):
+        lines += plan_lines(child, depth)
+    return lines
+
+
+def report_html(profile: dict) -> str:
+    rows = []
+    for entry in profile["queries"]:
+        sql = html.escape(entry["sql"][:160] + ("…" if len(entry["sql"]) > 160 else ""))
+        if "plan" in entry:
+            sql += f"<details><summary>plan</summary><pre>{html.escape(chr(10).join(plan_lines(entry['plan'])))}</pre></details>"
+        rows.append(
+            f"<tr><td><code>{entry['query_hash']}</code></td><td>{entry['wall_s'] * 1000:.1f}</td>"
+            f"<td>{entry['share']:.0%}</td><td>{entry['rows']:,}</td><td>{entry['rows_scanned']:,}</td>"
+            f"<td>{entry['bytes_scanned'] / 1e6:.2f}</td><td>{'hit' if entry['cached'] else ''}</td><td>{sql}</td></tr>"
+        )
+    return (
+        f"<h3>Query profile: {html.escape(profile['lab'])}</h3>"
+        f"<p>{profile['queries_run']} queries, {profile['cache_hits']} served from cache, "
+        f"{profile['total_wall_s']:.3f}s in total.</p>"
+        "<table><tr><th>hash</th><th>ms</th><th>share</th><th>rows</th><th>rows scanned</th>"
+        "<th>MB scanned (est.)</th><th>cache</th><th>query</th></tr>" + "".join(rows) + "</table>"
+    )
+
+
+def show_report(name: str):
+    """Save this lab's profile and display it; call from the lab's last cell."""
+    from IPython.display import HTML, display
+
+    if level() == "0":
+        return
+    save_report(name)
+    display(HTML(report_html(report(name))))
+
+
+def combine_reports(paths: list) -> dict:
+    """Merge per-lab profiles into one run-wide ranking of queries."""
+    queries = []
+    for path in paths:
+        profile = json.loads(Path(path).read_text())
+        queries += [{"lab": profile["lab"], **entry} for entry in profile["queries"]]
+    queries.sort(key=lambda entry: entry["wall_s"], reverse=True)
+    return {"total_wall_s": round(sum(entry["wall_s"] for entry in queries), 6), "queries": queries}
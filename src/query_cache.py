@@ -0,0 +1,109 @@
+"""On-disk cache for lab query results.
+
+A result is stored as Parquet under a key built from the normalized SQL text and a fingerprint
+of every input the query reads. Changing the SQL or touching an input file produces a new key,
+so stale entries are never served; they simply age out. The cache is bounded in bytes and
+evicts the least recently used entries first (a hit refreshes the file's mtime).
+"""
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = PROJECT_ROOT / ".cache" / "queries"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Set LAB_QUERY_CACHE=0 to bypass the cache; LAB_QUERY_CACHE_MAX_MB bounds its size
+ENABLED_ENV = "LAB_QUERY_CACHE"
+MAX_MB_ENV = "LAB_QUERY_CACHE_MAX_MB"
+
+
+def enabled() -> bool:
+    return os.environ.get(ENABLED_ENV, "1") != "0"
+
+
+# Quoted strings and identifiers are matched first, so runs of comments and whitespace are only
+# recognised outside them ('' and "" are escaped quotes inside)
+SQL_TOKENS = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|(?:--[^\n]*|\s)+""")
+
+
+def normalize_sql(sql: str) -> str:
+    """Drop comments, collapse whitespace and trailing semicolons; literals are left untouched.
+
+    >>> normalize_sql("SELECT 'x--1'  AS tag -- note\\n FROM orders;")
+    "SELECT 'x--1' AS tag FROM orders"
+    >>> normalize_sql("SELECT 'a  b'") == normalize_sql("SELECT 'a b'")
+    False
+    """
+    sql = SQL_TOKENS.sub(lambda token: token.group() if token.group()[0] in "'\"" else " ", sql)
+    return sql.strip().rstrip(";").strip()
+
+
+def cache_key(sql: str, fingerprint: dict) -> str:
+    payload = json.dumps({"sql": normalize_sql(sql), "inputs": fingerprint}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def file_fingerprint(paths: list) -> list:
+    """Cheap identity of input files: path, size and modification time."""
+    fingerprint = []
+    for path in sorted(Path(p) for p in paths):
+        stat = path.stat()
+        fingerprint.append([str(path), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def max_bytes() -> int:
+    max_mb = os.environ.get(MAX_MB_ENV)
+    return int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+
+
+def evict(limit: int = None, cache_dir: Path = CACHE_DIR):
+    """Delete least recently used entries until the cache fits in ``limit`` bytes."""
+    limit = max_bytes() if limit is None else limit
+    entries = []
+    for path in cache_dir.glob("*.parquet"):
+        stat = path.stat()
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def cached_query(run, sql: str, fingerprint: dict, cache_dir: Path = CACHE_DIR, arrow: bool = False):
+    """Return the result of ``sql``, calling ``run(sql)`` only on a cache miss.
+
+    ``run`` executes the query and returns a DataFrame, or an Arrow table with ``arrow``;
+    ``fingerprint`` describes its inputs. The two result kinds are cached separately because
+    their column types differ (DuckDB decimals become floats in pandas).
+    """
+    if not enabled():
+        return run(sql)
+
+    if arrow:
+        fingerprint = {**fingerprint, "__result__": "arrow"}
+    path = cache_dir / f"{cache_key(sql, fingerprint)}.parquet"
+    if path.exists():
+        os.utime(path)
+        return pq.read_table(path) if arrow else pd.read_parquet(path)
+
+    result = run(sql)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # write then rename so a concurrent lab never reads a partial file
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    if isinstance(result, pa.Table):
+        pq.write_table(result, tmp_path)
+    else:
+        result.to_parquet(tmp_path, index=False)
+    tmp_path.replace(path)
+    evict(cache_dir=cache_dir)
+    return result
@@ -0,0 +1,176 @@
+"""Execute the lab notebooks in parallel and write their HTML reports.
+
+Each lab in ``notebooks_py/`` is converted with jupytext and executed with nbconvert in its own
+process, exactly as the CI loop did one after another; the HTML goes to ``--output-dir`` and the
+labs keep writing ``assets/*.png`` themselves. A refresh therefore takes about as long as the
+slowest lab. Per-lab wall time and peak memory are printed and saved to ``run_summary.json``.
+
+Builds are incremental: ``build_manifest.json`` in the output directory records a fingerprint of
+each lab's source (plus the ``src/`` modules it imports), the data files it reads and the
+generator parameters. Labs whose fingerprint is unchanged and whose HTML and PNG outputs exist
+are skipped; ``--force`` reruns everything.
+
+Each lab saves its query profile next to its HTML (``<lab>.profile.json``); they are merged into
+``profile.json`` and the slowest queries of the run are printed.
+
+Usage: python src/run_reports.py --workers 4 --output-dir reports/latest
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import build_manifest
+import profiling
+import query_cache
+import warehouse
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+LABS_DIR = PROJECT_ROOT / "notebooks_py"
+BUILD_DIR = PROJECT_ROOT / "notebooks_build"
+MANIFEST_NAME = "build_manifest.json"
+HOT_QUERIES = 5
+GENERATOR_MANIFEST = PROJECT_ROOT / "data" / "generator_manifest.json"
+
+
+def lab_outputs(lab: Path, output_dir: Path) -> list:
+    """The HTML report plus every PNG the lab saves."""
+    charts = re.findall(r"savefig\(\s*['\"]([^'\"]+)['\"]", lab.read_text())
+    return [output_dir / f"{lab.stem}.html", *(PROJECT_ROOT / chart for chart in charts)]
+
+
+def lab_fingerprint(lab: Path) -> str:
+    data_files = {
+        path for table in warehouse.referenced_tables(lab.read_text()) for path in warehouse.source_files(table)
+    }
+    return build_manifest.fingerprint(
+        build_manifest.source_hash(lab),
+        build_manifest.load(GENERATOR_MANIFEST).get("fingerprint"),
+        query_cache.file_fingerprint(data_files),
+    )
+
+
+def stale_labs(labs: list, output_dir: Path, manifest: dict) -> list:
+    return [
+        lab for lab in labs
+        if manifest.get(lab.stem) != lab_fingerprint(lab)
+        or not all(path.exists() for path in lab_outputs(lab, output_dir))
+    ]
+
+
+def lab_env(workers: int, output_dir: Path) -> dict:
+    env = dict(os.environ)
+    env.setdefault("MPLBACKEND", "Agg")
+    env.setdefault("MISTUNE_USE_LEGACY", "1")
+    # split the cores between concurrent labs instead of letting every DuckDB grab all of them
+    env.setdefault("LAB_DUCKDB_THREADS", str(max(1, (os.cpu_count() or 1) // workers)))
+    env[profiling.DIR_ENV] = str(output_dir)
+    return env
+
+
+def run_measured(cmd: list, env: dict) -> tuple:
+    """Run ``cmd`` and return (returncode, output, peak RSS in MB of it and its reaped children)."""
+    proc = subprocess.Popen(cmd, cwd=PROJECT_ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = proc.stdout.read().decode(errors="replace")
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    proc.stdout.close()
+    return proc.returncode, output, usage.ru_maxrss / 1024
+
+
+def run_lab(lab: Path, output_dir: Path, env: dict) -> dict:
+    """Convert and execute one lab; runs in its own processes so labs never share a kernel."""
+    notebook = BUILD_DIR / f"{lab.stem}.ipynb"
+    start = time.perf_counter()
+    code, output, _ = run_measured(
+        [sys.executable, "-m", "jupytext", "--from", "py:percent", "--to", "ipynb", str(lab), "-o", str(notebook)],
+        env,
+    )
+    peak_mb = 0.0
+    if code == 0:
+        code, output, peak_mb = run_measured(
+            [sys.executable, "-m", "jupyter", "nbconvert", "--to", "html", "--execute", str(notebook),
+             "--output-dir", str(output_dir)],
+            env,
+        )
+    return {
+        "lab": lab.stem,
+        "ok": code == 0,
+        "wall_s": round(time.perf_counter() - start, 2),
+        "peak_rss_mb": round(peak_mb, 1),
+        "output": output if code else "",
+    }
+
+
+def run_reports(labs: list, output_dir: Path, workers: int) -> list:
+    BUILD_DIR.mkdir(exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (PROJECT_ROOT / "assets").mkdir(exist_ok=True)
+    env = lab_env(workers, output_dir)
+    # threads only wait on the lab processes, so a thread pool is enough to fan them out
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda lab: run_lab(lab, output_dir, env), labs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output-dir", type=Path, default=PROJECT_ROOT / "reports" / "latest")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="labs executed at once")
+    parser.add_argument("--labs", nargs="*", help="lab names to run, e.g. 01_joins (default: all)")
+    parser.add_argument("--force", action="store_true", help="rerun labs even if their inputs are unchanged")
+    args = parser.parse_args()
+    output_dir = args.output_dir.resolve()
+
+    labs = sorted(LABS_DIR.glob("*.py"))
+    if args.labs:
+        labs = [lab for lab in labs if lab.stem in args.labs]
+    manifest_path = output_dir / MANIFEST_NAME
+    manifest = build_manifest.load(manifest_path)
+    stale = labs if args.force else stale_labs(labs, output_dir, manifest)
+    for lab in labs:
+        if lab not in stale:
+            print(f"{lab.stem:<24} fresh (inputs unchanged)")
+
+    start = time.perf_counter()
+    results = run_reports(stale, output_dir, max(1, min(args.workers, len(stale)))) if stale else []
+    total_s = round(time.perf_counter() - start, 2)
+
+    for lab, result in zip(stale, results):
+        if result["ok"]:
+            manifest[lab.stem] = lab_fingerprint(lab)
+    build_manifest.save(manifest_path, manifest)
+
+    for result in results:
+        status = "ok" if result["ok"] else "FAILED"
+        print(f"{result['lab']:<24} {status:<7} {result['wall_s']:>7.2f}s {result['peak_rss_mb']:>8.1f} MB")
+        if not result["ok"]:
+            print(result["output"][-4000:])
+    print(f"{'total':<24} {'':<7} {total_s:>7.2f}s")
+
+    profiles = sorted(output_dir.glob("*.profile.json"))
+    if profiles:
+        profile = profiling.combine_reports(profiles)
+        (output_dir / "profile.json").write_text(json.dumps(profile, indent=2) + "\n")
+        print(f"\nslowest queries ({profile['total_wall_s']:.2f}s of queries in total):")
+        for entry in profile["queries"][:HOT_QUERIES]:
+            print(f"{entry['lab']:<24} {entry['query_hash']} {entry['wall_s']:>7.3f}s {entry['sql'][:60]}")
+
+    # fresh labs keep their entry from the run that last executed them and total_wall_s is this
+    # run's; a run with nothing to do leaves the summary alone
+    if results:
+        summary_path = output_dir / "run_summary.json"
+        entries = {entry["lab"]: entry for entry in build_manifest.load(summary_path).get("labs", [])}
+        entries.update({r["lab"]: {k: v for k, v in r.items() if k != "output"} for r in results})
+        summary = {"total_wall_s": total_s, "labs": [entries[name] for name in sorted(entries)]}
+        summary_path.write_text(json.dumps(summary, indent=2) + "\n")
+    if not all(result["ok"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Shared DuckDB connection for the labs.
+
+Every lab imports this module instead of carrying its own bootstrap. The first call to
+``connect`` opens one connection per process and later calls reuse it. When the prebuilt
+``data/warehouse.duckdb`` exists it is opened read-only, which costs nothing until a table is
+queried. Otherwise an in-memory database is used and only the tables a lab asks for are
+created and seeded from ``sql/``; derived tables (the revenue rollups and the cohort cube) are
+built from their base tables on demand.
+
+``query`` is the labs' entry point: results are served from ``query_cache`` when the SQL and its
+input files are unchanged, in which case no connection is opened at all. Every query, cached or
+not, is recorded by ``profiling``. ``query_arrow`` returns an Arrow table instead, and ``stream``
+yields record batches for results too large to hold at once.
+"""
+import inspect
+import os
+import re
+import time
+from pathlib import Path
+
+import duckdb
+import pyarrow as pa
+
+import arrow_ops
+import build_manifest
+import cohorts
+import profiling
+import query_cache
+import rollups
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATABASE_PATH = PROJECT_ROOT / "data" / "warehouse.duckdb"
+SCHEMA_PATH = PROJECT_ROOT / "sql" / "schema.sql"
+SEED_PATH = PROJECT_ROOT / "sql" / "seed.sql"
+
+# Defaults let a report runner cap each lab's resources without editing the notebooks
+THREADS_ENV = "LAB_DUCKDB_THREADS"
+MEMORY_LIMIT_ENV = "LAB_DUCKDB_MEMORY_LIMIT"
+STREAM_BATCH_ROWS = 100_000
+
+# Derived tables: name -> (base tables, builder that creates it on a connection holding them)
+DERIVED_TABLES = {
+    **{table: (sources, rollups.build_rollups) for table, sources in rollups.SOURCES.items()},
+    **{table: (sources, cohorts.build_cohort_cube) for table, sources in cohorts.SOURCES.items()},
+}
+
+_connection = None
+_in_memory = False
+_loaded_tables = set()
+
+
+def _statements_by_table(sql_path: Path, pattern: str) -> dict:
+    """Split a SQL script into statements keyed by the table each one targets."""
+    statements = {}
+    for statement in sql_path.read_text().split(";"):
+        match = re.search(pattern, statement, flags=re.IGNORECASE)
+        if match:
+            statements.setdefault(match.group(1), []).append(statement.strip() + ";")
+    return statements
+
+
+def _load_tables(con: duckdb.DuckDBPyConnection, tables: list):
+    """Create and seed ``tables`` in an in-memory connection, skipping ones already loaded."""
+    derived = [table for table in tables if table in DERIVED_TABLES and table not in _loaded_tables]
+    tables = [table for table in tables if table not in DERIVED_TABLES]
+    tables += [source for table in derived for source in DERIVED_TABLES[table][0]]
+    missing = list(dict.fromkeys(table for table in tables if table not in _loaded_tables))
+    create = _statements_by_table(SCHEMA_PATH, r"CREATE TABLE\s+(\w+)")
+    seed = _statements_by_table(SEED_PATH, r"(?:COPY|INSERT INTO)\s+(\w+)")
+    indexes = _statements_by_table(SCHEMA_PATH, r"CREATE INDEX\s+\w+\s+ON\s+(\w+)")
+    # seed.sql uses paths relative to the project root
+    cwd = os.getcwd()
+    os.chdir(PROJECT_ROOT)
+    try:
+        for table in missing:
+            for statement in create[table] + seed.get(table, []) + indexes.get(table, []):
+                con.execute(statement)
+            _loaded_tables.add(table)
+    finally:
+        os.chdir(cwd)
+    # a builder may create several derived tables at once, so run each one only once
+    for builder in dict.fromkeys(DERIVED_TABLES[table][1] for table in derived):
+        builder(con)
+        _loaded_tables.update(table for table, (_, build) in DERIVED_TABLES.items() if build is builder)
+
+
+def connect(tables: list = None, threads: int = None, memory_limit: str = None) -> duckdb.DuckDBPyConnection:
+    """Return the process-wide connection, opening it on first use.
+
+    ``tables`` lists what the caller queries; it only matters for the in-memory fallback, where
+    nothing else is loaded. ``threads`` and ``memory_limit`` (e.g. ``"2GB"``) apply when the
+    connection is opened and default to the ``LAB_DUCKDB_*`` environment variables.
+    """
+    global _connection, _in_memory
+    if _connection is None:
+        config = {}
+        threads = threads or os.environ.get(THREADS_ENV)
+        memory_limit = memory_limit or os.environ.get(MEMORY_LIMIT_ENV)
+        if threads:
+            config["threads"] = int(threads)
+        if memory_limit:
+            config["memory_limit"] = memory_limit
+        _in_memory = not DATABASE_PATH.exists()
+        if _in_memory:
+            _connection = duckdb.connect(database=":memory:", config=config)
+            # the ENUM types every table may use come first in schema.sql
+            for statements in _statements_by_table(SCHEMA_PATH, r"CREATE TYPE\s+(\w+)").values():
+                for statement in statements:
+                    _connection.execute(statement)
+        else:
+            _connection = duckdb.connect(database=str(DATABASE_PATH), read_only=True, config=config)
+
+    if _in_memory:
+        _load_tables(_connection, tables or all_tables())
+    return _connection
+
+
+def thread_budget() -> int:
+    """Threads this process should use: the open connection's setting, else ``LAB_DUCKDB_THREADS``.
+
+    ``run_reports`` splits the machine between labs through that variable, so NumPy work that
+    fans out to processes should stay within it too. Without either, every CPU.
+    """
+    if _connection is not None:
+        return int(_connection.execute("SELECT current_setting('threads')").fetchone()[0])
+    return int(os.environ.get(THREADS_ENV) or os.cpu_count() or 1)
+
+
+def all_tables() -> list:
+    """Base tables from the schema followed by the derived tables."""
+    return list(_statements_by_table(SCHEMA_PATH, r"CREATE TABLE\s+(\w+)")) + list(DERIVED_TABLES)
+
+
+def referenced_tables(sql: str) -> list:
+    """Schema tables named in ``sql``; a conservative superset is fine for loading and caching."""
+    words = set(re.findall(r"\w+", sql.lower()))
+    return [table for table in all_tables() if table in words]
+
+
+def source_files(table: str) -> list:
+    """Files a table's data comes from: the prebuilt database, or the schema and its seed files."""
+    if DATABASE_PATH.exists():
+        return [DATABASE_PATH]
+    if table in DERIVED_TABLES:
+        return list(dict.fromkeys(path for source in DERIVED_TABLES[table][0] for path in source_files(source)))
+    seed = _statements_by_table(SEED_PATH, r"(?:COPY|INSERT INTO)\s+(\w+)")
+    paths = [SCHEMA_PATH]
+    for statement in seed.get(table, []):
+        paths += [PROJECT_ROOT / path for path in re.findall(r"'([^']+\.(?:csv|parquet))'", statement)]
+    return paths
+
+
+def table_fingerprint(table: str) -> dict:
+    """Cache identity of a table: its source files, plus the code of a derived table's builder.
+
+    In the in-memory fallback a derived table is rebuilt by that code on every run, so editing
+    ``rollups.py`` or ``cohorts.py`` must invalidate results cached from it.
+    """
+    fingerprint = {"files": query_cache.file_fingerprint(source_files(table))}
+    if table in DERIVED_TABLES:
+        fingerprint["builder"] = build_manifest.source_hash(Path(inspect.getsourcefile(DERIVED_TABLES[table][1])))
+    return fingerprint
+
+
+def query(sql: str, cache: bool = True, arrow: bool = False):
+    """Run ``sql`` against the lab data and return a DataFrame, reusing cached results.
+
+    With ``arrow`` the result is a ``pyarrow.Table`` fetched straight from DuckDB's Arrow output.
+    """
+    tables = referenced_tables(sql)
+    executed = []
+
+    def run(statement: str):
+        executed.append(statement)
+        return profiling.run_profiled(connect(tables), statement, arrow=arrow)
+
+    if not cache:
+        result = run(sql)
+        return arrow_ops.pandas_compatible(result) if arrow else result
+    fingerprint = {table: table_fingerprint(table) for table in tables}
+    start = time.perf_counter()
+    result = query_cache.cached_query(run, sql, fingerprint, arrow=arrow)
+    if arrow:
+        result = arrow_ops.pandas_compatible(result)
+    if not executed and profiling.level() != "0":
+        profiling.record(sql, time.perf_counter() - start, len(result), cached=True)
+    return result
+
+
+def query_arrow(sql: str, cache: bool = True) -> pa.Table:
+    return query(sql, cache=cache, arrow=True)
+
+
+def stream(sql: str, batch_rows: int = STREAM_BATCH_ROWS) -> pa.RecordBatchReader:
+    """Arrow record batches of ``sql``'s result, read from DuckDB as they are consumed (not cached)."""
+    return arrow_ops.pandas_compatible(connect(referenced_tables(sql)).execute(sql).fetch_record_batch(batch_rows))
+
+
+def close():
+    """Close the shared connection; the next ``connect`` opens a fresh one."""
+    global _connection
+    if _connection is not None:
+        _connection.close()
+    _connection = None
+    _loaded_tables.clear()
+
+
+def preview(tables: list, limit: int = 5):
+    """Display the first rows of each table, as the labs do before their first query."""
+    from IPython.display import display
+
+    for table in tables:
+        display(query(f"SELECT * FROM {table} LIMIT {limit}"))